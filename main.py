@@ -9,37 +9,84 @@ Usage:
     python main.py process        # Run content processing only
     python main.py digest         # Generate and send digest
     python main.py init           # Initialize database and seed data
+    python main.py migrate        # Upgrade a database created by an older release
+                                  # (--allow-deletes: drop orphaned and duplicate rows)
 """
 
+import logging
+import os
+import signal
 import sys
-import time
+import threading
+from collections.abc import Callable
+from typing import Any
 
 import structlog
+from structlog.typing import Processor
 
-structlog.configure(
-    processors=[
+processors: list[Processor]
+logger_factory: Callable[..., Any]
+if sys.stdout.isatty():
+    processors = [
         structlog.processors.TimeStamper(fmt="iso"),
         structlog.processors.StackInfoRenderer(),
         structlog.processors.format_exc_info,
         structlog.dev.ConsoleRenderer(),
-    ],
+    ]
+    logger_factory = structlog.PrintLoggerFactory()
+else:
+    # Non-interactive runs (cron, scheduler) log one JSON object per line
+    try:
+        import orjson
+    except ImportError:
+        orjson = None  # type: ignore[assignment]
+
+    processors = [
+        structlog.processors.TimeStamper(fmt="iso", utc=True),
+        structlog.processors.add_log_level,
+        structlog.processors.format_exc_info,
+    ]
+    if orjson:
+        processors.append(structlog.processors.JSONRenderer(serializer=orjson.dumps))
+        logger_factory = structlog.BytesLoggerFactory(sys.stdout.buffer)
+    else:
+        processors.append(structlog.processors.JSONRenderer())
+        logger_factory = structlog.WriteLoggerFactory(sys.stdout)
+
+structlog.configure(
+    processors=processors,
+    # Calls below LOG_LEVEL (default INFO) return before any processing
+    wrapper_class=structlog.make_filtering_bound_logger(
+        getattr(logging, os.environ.get("LOG_LEVEL", "INFO").upper(), logging.INFO)
+    ),
     context_class=dict,
-    logger_factory=structlog.PrintLoggerFactory(),
+    logger_factory=logger_factory,
+    cache_logger_on_first_use=True,
 )
 
 logger = structlog.get_logger()
 
 
 def init_database():
-    from src.storage import init_db
     from src.conferences import seed_conferences
 
     logger.info("initializing_database")
-    init_db()
+    run_migrations()
     seed_conferences()
     logger.info("database_initialized")
 
 
+def run_migrations() -> None:
+    from src.storage import MigrationError, migrate
+
+    try:
+        applied = migrate(allow_deletes="--allow-deletes" in sys.argv[2:])
+    except MigrationError as e:
+        logger.error("migration_refused", error=str(e))
+        sys.exit(1)
+    logger.info("migrations_applied", migrations=applied)
+
+
 def run_collection():
     from src.collectors import RSSCollector, YouTubeCollector
     from src.config import sources
@@ -67,24 +114,29 @@ def run_digest():
     generator = DigestGenerator()
     sender = EmailSender()
 
-    digest = generator.create_and_save_digest()
-    if digest:
-        sender.send_digest(digest)
+    try:
+        digest = generator.create_and_save_digest()
+        if digest:
+            sender.send_digest(digest)
+    finally:
+        sender.close()
 
 
 def serve():
     from src.scheduler import DigestScheduler
 
     scheduler = DigestScheduler()
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
 
     try:
         scheduler.start()
         logger.info("scheduler_running", message="Press Ctrl+C to stop")
-        while True:
-            time.sleep(60)
+        stop_event.wait()
     except KeyboardInterrupt:
-        logger.info("shutting_down")
-        scheduler.stop()
+        stop_event.set()
+    logger.info("shutting_down")
+    scheduler.stop()
 
 
 def main():
@@ -96,6 +148,7 @@ def main():
 
     commands = {
         "init": init_database,
+        "migrate": run_migrations,
         "serve": serve,
         "run": lambda: (run_collection(), run_processing(), run_digest()),
         "collect": run_collection,
@@ -5,213 +5,440 @@ Run with: python3 server.py
 Then open: http://localhost:8000
 """
 
-import json
+import functools
+import threading
+import time
 import urllib.parse
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
+from types import ModuleType
+from typing import Any, Optional, Union
 
-from src import api
-from src.storage import init_db
+# Fastest available JSON backend: orjson, then ujson, then stdlib
+_dumps: Callable[[Any], bytes]
+_loads: Callable[[bytes], Any]
+_JSONDecodeError: type[ValueError]
+try:
+    import orjson
+
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+    _JSONDecodeError = orjson.JSONDecodeError
+except ImportError:
+    try:
+        import ujson  # type: ignore[import-untyped]
+
+        def _ujson_dumps(data: Any) -> bytes:
+            text: str = ujson.dumps(data, ensure_ascii=False)
+            return text.encode()
+
+        _dumps = _ujson_dumps
+        _loads = ujson.loads
+        _JSONDecodeError = ValueError
+    except ImportError:
+        import json
+
+        def _json_dumps(data: Any) -> bytes:
+            return json.dumps(data).encode()
+
+        _dumps = _json_dumps
+        _loads = json.loads
+        _JSONDecodeError = json.JSONDecodeError
+
+
+@functools.cache
+def _api() -> ModuleType:
+    # Deferred so importing server.py doesn't load SQLAlchemy and the models
+    from src import api
+
+    return api
+
+
+@functools.cache
+def _request_scope() -> Callable[[], AbstractContextManager[Any]]:
+    from src.storage import request_scope
+
+    return request_scope
+
+
+_GET, _POST, _DELETE = "GET", "POST", "DELETE"
+_ID = ":id"
+
+# (handler, query or body, *ids) -> response data
+_Route = Callable[..., Any]
+# (method, path segments) -> (route, ids), or (None, ()) if nothing matches
+_Resolver = Callable[[str, list[str]], tuple[Optional[_Route], tuple[int, ...]]]
+
+
+def _not_found(data: Any) -> Any:
+    return data or {"error": "Not found"}
+
+
+def _split_target(target: str) -> tuple[str, str]:
+    """Split a request target into (path, query string) without urlparse."""
+    qpos = target.find("?")
+    if qpos < 0:
+        return target, ""
+    return target[:qpos], target[qpos + 1:]
+
+
+def _parse_query(qs: str) -> dict[str, str]:
+    # Values stay percent-encoded; _param decodes only what a route reads
+    if not qs:
+        return {}
+    return dict(kv.split("=", 1) for kv in qs.split("&") if "=" in kv)
+
+
+def _param(query: dict[str, str], name: str, default: str) -> str:
+    value = query.get(name)
+    return default if value is None else urllib.parse.unquote_plus(value)
+
+
+def _page(query: dict[str, str]) -> dict[str, int]:
+    """limit/offset from the query string; absent or malformed values are skipped."""
+    page = {}
+    for name in ("limit", "offset"):
+        value = query.get(name, "")
+        if value.isdigit():
+            page[name] = int(value)
+    return page
+
+
+# === Route handlers: (handler, params, *ids) -> response data ===
+
+def _feed(handler: "ContentOSHandler", query: dict[str, str]) -> Any:
+    filter_type = _param(query, "filter", "all")
+    content_type = filter_type if filter_type != "all" else None
+    return _api().get_content_feed(limit=50, content_type=content_type)
+
+
+def _search(handler: "ContentOSHandler", query: dict[str, str]) -> Any:
+    return _api().search(_param(query, "q", ""))
+
+
+def _delete(name: str) -> _Route:
+    def route(handler: "ContentOSHandler", body: dict[str, Any], *ids: int) -> dict[str, bool]:
+        getattr(_api(), name)(*ids)
+        return {"success": True}
+    return route
+
+
+ROUTES: dict[str, Any] = {
+    "api": {
+        "feed": {_GET: _feed},
+        "search": {_GET: _search},
+        "stats": {_GET: lambda h, q: _api().get_stats()},
+        "content": {
+            _ID: {
+                _GET: lambda h, q, cid: _not_found(_api().get_content_item(cid)),
+                "themes": {
+                    _ID: {
+                        _POST: lambda h, b, cid, tid: _not_found(
+                            _api().tag_content_theme(cid, tid)
+                        ),
+                        _DELETE: _delete("untag_content_theme"),
+                    },
+                },
+                "tags": {
+                    _POST: lambda h, b, cid: _not_found(_api().bulk_tag_content(
+                        cid, b.get("theme_ids", ()), b.get("company_ids", ())
+                    )),
+                },
+                "companies": {
+                    _ID: {
+                        _POST: lambda h, b, cid, coid: _not_found(
+                            _api().tag_content_company(cid, coid)
+                        ),
+                        _DELETE: _delete("untag_content_company"),
+                    },
+                },
+            },
+        },
+        "themes": {
+            _GET: lambda h, q: _api().get_themes(**_page(q)),
+            _POST: lambda h, b: _api().create_theme(b.get("name", ""), b.get("description")),
+            _ID: {
+                _GET: lambda h, q, tid: _not_found(_api().get_theme(tid)),
+                _POST: lambda h, b, tid: _not_found(
+                    _api().update_theme(tid, b.get("name"), b.get("description"))
+                ),
+                _DELETE: _delete("delete_theme"),
+            },
+        },
+        "companies": {
+            _GET: lambda h, q: _api().get_companies(**_page(q)),
+            _POST: lambda h, b: _api().create_company(
+                b.get("name", ""), b.get("website"), b.get("status", "Watch")
+            ),
+            _ID: {
+                _GET: lambda h, q, coid: _not_found(_api().get_company(coid)),
+                _POST: lambda h, b, coid: _not_found(_api().update_company(
+                    coid, b.get("name"), b.get("website"), b.get("notes"), b.get("status")
+                )),
+                _DELETE: _delete("delete_company"),
+            },
+        },
+        "leads": {
+            _GET: lambda h, q: _api().get_leads(**_page(q)),
+            _POST: lambda h, b: _not_found(_api().create_lead(
+                b.get("company_id"), b.get("content_id"), b.get("why_now")
+            )),
+            _ID: {
+                _GET: lambda h, q, lid: _not_found(_api().get_lead(lid)),
+                _POST: lambda h, b, lid: _not_found(
+                    _api().update_lead(lid, b.get("stage"), b.get("why_now"), b.get("owner_note"))
+                ),
+                _DELETE: _delete("delete_lead"),
+                "questions": {_POST: lambda h, b, lid: _not_found(_api().generate_questions(lid))},
+                "outreach": {
+                    _POST: lambda h, b, lid: _not_found(
+                        _api().generate_outreach(lid, b.get("tone", "professional"))
+                    ),
+                },
+            },
+        },
+    },
+}
+
+
+def split_path(path: str) -> list[str]:
+    return path.strip("/").split("/")
+
+
+def _route_shapes(
+    node: dict[str, Any], prefix: tuple[str, ...] = ()
+) -> Iterator[tuple[str, tuple[str, ...], _Route]]:
+    """Yield (method, segments, route) for every leaf in the route trie."""
+    for key, child in node.items():
+        if key in (_GET, _POST, _DELETE):
+            yield key, prefix, child
+        else:
+            yield from _route_shapes(child, prefix + (key,))
+
+
+def _compile_routes(routes: dict[str, Any]) -> _Resolver:
+    """Generate a resolve(method, segs) function from the route trie.
+
+    Each route shape becomes one chain of segment comparisons, so a lookup
+    runs straight-line bytecode instead of walking nested dicts. Shapes are
+    ordered so literal segments win over numeric IDs, matching the trie.
+
+    Returns (route, ids) or (None, ()) if nothing matches.
+    """
+    by_method: dict[str, list[tuple[tuple[str, ...], _Route]]] = {}
+    for method, shape, route in _route_shapes(routes):
+        by_method.setdefault(method, []).append((shape, route))
+
+    namespace: dict[str, Any] = {}
+    lines = ["def resolve(method, segs):", "    n = len(segs)"]
+    for method, shapes in by_method.items():
+        lines.append(f"    if method == {method!r}:")
+        shapes.sort(key=lambda item: tuple(seg == _ID for seg in item[0]))
+        for shape, route in shapes:
+            name = f"_r{len(namespace)}"
+            namespace[name] = route
+            conds = [f"n == {len(shape)}"]
+            ids = []
+            for i, seg in enumerate(shape):
+                if seg == _ID:
+                    # ASCII digits only (str.isdigit alone accepts e.g. "²",
+                    # which int() rejects); < 10 chars keeps IDs in range
+                    s_i = f"segs[{i}]"
+                    conds.append(f"len({s_i}) < 10 and {s_i}.isascii() and {s_i}.isdigit()")
+                    ids.append(f"int({s_i}, 10)")
+                else:
+                    conds.append(f"segs[{i}] == {seg!r}")
+            id_tuple = f"({', '.join(ids)},)" if ids else "()"
+            lines.append(f"        if {' and '.join(conds)}:")
+            lines.append(f"            return {name}, {id_tuple}")
+    lines.append("    return None, ()")
+
+    exec(compile("\n".join(lines), "<routes>", "exec"), namespace)
+    resolver: _Resolver = namespace["resolve"]
+    return resolver
+
+
+resolve = _compile_routes(ROUTES)
+
+
+# === Response cache for read-heavy GET endpoints ===
+
+_CacheKey = tuple[str, tuple[tuple[str, str], ...]]
+
+_CACHE: dict[_CacheKey, tuple[float, bytes]] = {}
+_CACHE_TTL = 30.0
+_CACHE_LOCK = threading.Lock()
+# Bumped by every invalidation; a GET only caches what it read if no write
+# invalidated the cache while it ran
+_CACHE_GENERATION = 0
+
+_CACHEABLE = frozenset(("/api/feed", "/api/themes", "/api/companies", "/api/stats"))
+
+# Top-level resource written by a POST/DELETE -> cached paths it makes stale
+_INVALIDATES = {
+    "themes": ("/api/themes", "/api/feed", "/api/stats"),
+    "companies": ("/api/companies", "/api/feed", "/api/stats"),
+    "content": ("/api/feed", "/api/themes", "/api/companies", "/api/stats"),
+    "leads": ("/api/companies", "/api/stats"),
+}
+
+
+def _cache_key(path: str, query: dict[str, str]) -> _CacheKey:
+    return (path, tuple(sorted(query.items())))
+
+
+def _cache_get(key: _CacheKey) -> Optional[bytes]:
+    entry = _CACHE.get(key)
+    if entry and time.monotonic() - entry[0] < _CACHE_TTL:
+        return entry[1]
+    return None
+
+
+def _cache_set(key: _CacheKey, body: bytes, generation: int) -> None:
+    with _CACHE_LOCK:
+        if generation == _CACHE_GENERATION:
+            _CACHE[key] = (time.monotonic(), body)
+
+
+def invalidate(segs: list[str]) -> None:
+    global _CACHE_GENERATION
+    stale = _INVALIDATES.get(segs[1]) if len(segs) > 1 else None
+    if not stale:
+        return
+    with _CACHE_LOCK:
+        _CACHE_GENERATION += 1
+        for key in [k for k in _CACHE if k[0] in stale]:
+            del _CACHE[key]
+
+
+_HDR_200 = (
+    b"HTTP/1.1 200 OK\r\n"
+    b"Content-Type: application/json\r\n"
+    b"Access-Control-Allow-Origin: *\r\n"
+)
 
 
 class ContentOSHandler(SimpleHTTPRequestHandler):
-    def __init__(self, *args, **kwargs):
+    # Keep-alive, so the SPA's XHRs reuse one TCP connection
+    protocol_version = "HTTP/1.1"
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
         self.directory = str(Path(__file__).parent / "web")
         super().__init__(*args, directory=self.directory, **kwargs)
 
-    def do_GET(self):
-        parsed = urllib.parse.urlparse(self.path)
-        path = parsed.path
-        query = urllib.parse.parse_qs(parsed.query)
-        
+    def do_GET(self) -> None:
+        path, qs = _split_target(self.path)
+
         # Serve app.html for root
         if path == "/" or path == "":
             self.path = "/app.html"
             return super().do_GET()
-        
-        # API Routes
-        if path == "/api/feed":
-            filter_type = query.get("filter", ["all"])[0]
-            data = api.get_content_feed(limit=50, content_type=filter_type if filter_type != "all" else None)
-            return self.json_response(data)
-        
-        if path.startswith("/api/content/") and not "/themes" in path and not "/companies" in path:
-            content_id = int(path.split("/")[-1])
-            data = api.get_content_item(content_id)
-            return self.json_response(data or {"error": "Not found"})
-        
-        if path == "/api/themes":
-            data = api.get_themes()
-            return self.json_response(data)
-        
-        if path.startswith("/api/themes/") and path.count("/") == 3:
-            theme_id = int(path.split("/")[-1])
-            data = api.get_theme(theme_id)
-            return self.json_response(data or {"error": "Not found"})
-        
-        if path == "/api/companies":
-            data = api.get_companies()
-            return self.json_response(data)
-        
-        if path.startswith("/api/companies/") and path.count("/") == 3:
-            company_id = int(path.split("/")[-1])
-            data = api.get_company(company_id)
-            return self.json_response(data or {"error": "Not found"})
-        
-        if path == "/api/leads":
-            data = api.get_leads()
-            return self.json_response(data)
-        
-        if path.startswith("/api/leads/") and path.count("/") == 3:
-            lead_id = int(path.split("/")[-1])
-            data = api.get_lead(lead_id)
-            return self.json_response(data or {"error": "Not found"})
-        
-        if path == "/api/search":
-            q = query.get("q", [""])[0]
-            data = api.search(q)
-            return self.json_response(data)
-        
-        if path == "/api/stats":
-            data = api.get_stats()
-            return self.json_response(data)
-        
+
+        route, ids = resolve(_GET, split_path(path))
+        if route:
+            query = _parse_query(qs)
+            key = _cache_key(path, query) if path in _CACHEABLE else None
+            body = _cache_get(key) if key else None
+            if body is not None:
+                return self.send_json(body)
+            generation = _CACHE_GENERATION
+
+            # One session for every storage call the route makes
+            with _request_scope()():
+                body = _dumps(route(self, query, *ids))
+            self.send_json(body)
+            if key:
+                _cache_set(key, body, generation)
+            return
+
         # Fallback to static files
         return super().do_GET()
 
-    def do_POST(self):
-        parsed = urllib.parse.urlparse(self.path)
-        path = parsed.path
-        
+    def do_POST(self) -> None:
+        path = _split_target(self.path)[0]
+
         content_length = int(self.headers.get("Content-Length", 0))
-        body = {}
+        body: dict[str, Any] = {}
         if content_length > 0:
-            raw = self.rfile.read(content_length).decode("utf-8")
+            raw = self.rfile.read(content_length)
             try:
-                body = json.loads(raw)
-            except:
+                body = _loads(raw)
+            except _JSONDecodeError:
                 pass
-        
-        # Theme routes
-        if path == "/api/themes":
-            data = api.create_theme(body.get("name", ""), body.get("description"))
-            return self.json_response(data)
-        
-        if path.startswith("/api/themes/") and path.count("/") == 3:
-            theme_id = int(path.split("/")[-1])
-            data = api.update_theme(theme_id, body.get("name"), body.get("description"))
-            return self.json_response(data or {"error": "Not found"})
-        
-        # Company routes
-        if path == "/api/companies":
-            data = api.create_company(body.get("name", ""), body.get("website"), body.get("status", "Watch"))
-            return self.json_response(data)
-        
-        if path.startswith("/api/companies/") and path.count("/") == 3:
-            company_id = int(path.split("/")[-1])
-            data = api.update_company(company_id, body.get("name"), body.get("website"), body.get("notes"), body.get("status"))
-            return self.json_response(data or {"error": "Not found"})
-        
-        # Tagging routes
-        if "/themes/" in path and "/content/" in path:
-            parts = path.split("/")
-            content_id = int(parts[3])
-            theme_id = int(parts[5])
-            data = api.tag_content_theme(content_id, theme_id)
-            return self.json_response(data)
-        
-        if "/companies/" in path and "/content/" in path:
-            parts = path.split("/")
-            content_id = int(parts[3])
-            company_id = int(parts[5])
-            data = api.tag_content_company(content_id, company_id)
-            return self.json_response(data)
-        
-        # Lead routes
-        if path == "/api/leads":
-            data = api.create_lead(body.get("company_id"), body.get("content_id"), body.get("why_now"))
-            return self.json_response(data)
-        
-        if path.startswith("/api/leads/") and "/questions" in path:
-            lead_id = int(path.split("/")[3])
-            data = api.generate_questions(lead_id)
-            return self.json_response(data or {"error": "Not found"})
-        
-        if path.startswith("/api/leads/") and "/outreach" in path:
-            lead_id = int(path.split("/")[3])
-            data = api.generate_outreach(lead_id, body.get("tone", "professional"))
-            return self.json_response(data or {"error": "Not found"})
-        
-        if path.startswith("/api/leads/") and path.count("/") == 3:
-            lead_id = int(path.split("/")[-1])
-            data = api.update_lead(lead_id, body.get("stage"), body.get("why_now"), body.get("owner_note"))
-            return self.json_response(data or {"error": "Not found"})
-        
-        return self.json_response({"error": "Unknown endpoint"})
-
-    def do_DELETE(self):
-        parsed = urllib.parse.urlparse(self.path)
-        path = parsed.path
-        
-        # Theme delete
-        if path.startswith("/api/themes/") and path.count("/") == 3:
-            theme_id = int(path.split("/")[-1])
-            api.delete_theme(theme_id)
-            return self.json_response({"success": True})
-        
-        # Company delete
-        if path.startswith("/api/companies/") and path.count("/") == 3:
-            company_id = int(path.split("/")[-1])
-            api.delete_company(company_id)
-            return self.json_response({"success": True})
-        
-        # Lead delete
-        if path.startswith("/api/leads/") and path.count("/") == 3:
-            lead_id = int(path.split("/")[-1])
-            api.delete_lead(lead_id)
-            return self.json_response({"success": True})
-        
-        # Untag content-theme
-        if "/content/" in path and "/themes/" in path:
-            parts = path.split("/")
-            content_id = int(parts[3])
-            theme_id = int(parts[5])
-            api.untag_content_theme(content_id, theme_id)
-            return self.json_response({"success": True})
-        
-        # Untag content-company
-        if "/content/" in path and "/companies/" in path:
-            parts = path.split("/")
-            content_id = int(parts[3])
-            company_id = int(parts[5])
-            api.untag_content_company(content_id, company_id)
-            return self.json_response({"success": True})
-        
-        return self.json_response({"error": "Unknown endpoint"})
-
-    def json_response(self, data):
-        self.send_response(200)
-        self.send_header("Content-Type", "application/json")
-        self.send_header("Access-Control-Allow-Origin", "*")
-        self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
-
-    def log_message(self, format, *args):
-        # Quieter logging
-        if "/api/" in args[0]:
-            print(f"  API: {args[0]}")
-
-
-def run_server(port=8080):
+
+        return self._dispatch(_POST, path, body)
+
+    def do_DELETE(self) -> None:
+        path = _split_target(self.path)[0]
+        return self._dispatch(_DELETE, path, {})
+
+    def _dispatch(self, method: str, path: str, params: dict[str, Any]) -> None:
+        # Split once; the router and cache invalidation share the segments
+        segs = split_path(path)
+        route, ids = resolve(method, segs)
+        if not route:
+            return self.json_response({"error": "Unknown endpoint"})
+        try:
+            with _request_scope()():
+                result = route(self, params, *ids)
+        finally:
+            # After the write has committed (or failed), so a GET racing it
+            # can't re-cache the old data
+            invalidate(segs)
+        return self.json_response(result)
+
+    def json_response(self, data: Any) -> None:
+        self.send_json(_dumps(data))
+
+    def send_json(self, body: bytes) -> None:
+        # Status line, headers and body in a single gathered write
+        conn = b"Connection: close\r\n" if self.close_connection else b""
+        header = _HDR_200 + conn + b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n"
+        self.send_buffers(header, body)
+
+    def send_buffers(self, *buffers: bytes) -> None:
+        """Write buffers with one sendmsg (writev) call, without joining them."""
+        sendmsg = getattr(self.connection, "sendmsg", None)
+        if sendmsg is None:
+            self.wfile.write(b"".join(buffers))
+            return
+        views = [memoryview(buf) for buf in buffers if buf]
+        while views:
+            sent = sendmsg(views)
+            # Drop what went out; a short send leaves a partial first view
+            while sent:
+                head = len(views[0])
+                if sent < head:
+                    views[0] = views[0][sent:]
+                    break
+                sent -= head
+                views.pop(0)
+
+    def log_request(self, code: Union[int, str] = "-", size: Union[int, str] = "-") -> None:
+        if not self.path.startswith("/api/"):
+            super().log_request(code, size)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # Quieter logging: API responses skip send_response, so what reaches
+        # here for an API path is a send_error (whose args aren't all strings)
+        if self.path.startswith("/api/"):
+            print(f"  API: {format % args}")
+
+
+def run_server(port: int = 8080) -> None:
     # Initialize database and seed data
     print("\n  Initializing database...")
+    from src.storage import init_db
     init_db()
     
     print("  Seeding themes and companies...")
     from src.seed_data import seed_all
     seed_all()
     
-    server = HTTPServer(("localhost", port), ContentOSHandler)
+    # One thread per request so a slow API call doesn't stall other tabs
+    server = ThreadingHTTPServer(("localhost", port), ContentOSHandler)
     print(f"\n  ✓ Investor Content OS running at: http://localhost:{port}\n")
     print("  Press Ctrl+C to stop\n")
     
@@ -1,11 +1,33 @@
 """
 API handlers for Investor Content OS
+
+Handlers return plain dicts and lists of JSON-native values; server.py
+encodes them straight to bytes (orjson when installed).
 """
-import json
-from datetime import datetime, timezone
-from typing import Optional
+import queue
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Optional, TypeVar, Union
 
 import structlog
+from sqlalchemy import (
+    ColumnElement,
+    ScalarSelect,
+    Select,
+    case,
+    cast,
+    func,
+    literal,
+    null,
+    select,
+    union_all,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import InstrumentedAttribute, Session, defer, load_only, selectinload
 
 from src.storage import (
     Company,
@@ -16,63 +38,137 @@ from src.storage import (
     LeadAction,
     SessionLocal,
     Theme,
+    content_search,
+    content_search_available,
+    insert_ignore,
+    session_scope,
+    table_of,
 )
 
 logger = structlog.get_logger()
 
 
+@lru_cache(maxsize=4096)
+def _fmt_day(day: date) -> str:
+    return day.strftime("%b %d, %Y")
+
+
+def _fmt_date(value: datetime) -> str:
+    """Format as e.g. "Jan 05, 2025"; feed rows share days, so strftime is cached."""
+    return _fmt_day(value.date())
+
+
 # === Content API ===
 
+# Load tag rows and their theme/company in one query per level, not per item
+_TAG_LOADERS = (
+    selectinload(Content.theme_tags).selectinload(ContentThemeTag.theme),
+    selectinload(Content.company_tags).selectinload(ContentCompanyTag.company),
+)
+
+
+# Columns the list views render; leaves the large text columns unloaded
+_LIST_COLUMNS = load_only(
+    Content.id,
+    Content.title,
+    Content.source_url,
+    Content.source_name,
+    Content.content_type,
+    Content.publish_date,
+)
+
+FEED_SUMMARY_CHARS = 200
+
+# {"themes": [{"id", "name"}, ...], "companies": [...]}
+_TagRefs = dict[str, list[dict[str, Any]]]
+
+
+def _tag_refs(item: Content) -> _TagRefs:
+    return {
+        "themes": [{"id": t.theme.id, "name": t.theme.name} for t in item.theme_tags if t.theme],
+        "companies": [
+            {"id": c.company.id, "name": c.company.name} for c in item.company_tags if c.company
+        ],
+    }
+
+
+_FEED_COLUMNS = (
+    Content.id,
+    Content.title,
+    Content.source_url,
+    Content.source_name,
+    Content.content_type,
+    Content.publish_date,
+    # One char past the cutoff tells us whether to add an ellipsis
+    func.substr(Content.summary, 1, FEED_SUMMARY_CHARS + 1),
+)
+
+
+def _tag_refs_by_content(session: Session, content_ids: list[int]) -> dict[int, _TagRefs]:
+    """{content_id: {"themes": [...], "companies": [...]}} from two joined selects."""
+    refs: dict[int, _TagRefs] = {cid: {"themes": [], "companies": []} for cid in content_ids}
+    if not content_ids:
+        return refs
+    for key, tag, tag_fk, target in (
+        ("themes", ContentThemeTag, ContentThemeTag.theme_id, Theme),
+        ("companies", ContentCompanyTag, ContentCompanyTag.company_id, Company),
+    ):
+        rows = session.execute(
+            select(tag.content_id, target.id, target.name)
+            .join(target, target.id == tag_fk)
+            .where(tag.content_id.in_(content_ids))
+            .order_by(tag.content_id, tag_fk)
+        )
+        for content_id, ref_id, name in rows:
+            refs[content_id][key].append({"id": ref_id, "name": name})
+    return refs
+
+
 def get_content_feed(limit: int = 50, offset: int = 0, content_type: Optional[str] = None):
-    with SessionLocal() as session:
-        query = session.query(Content).order_by(Content.publish_date.desc())
+    """One feed page as {"items": [...], "total": n}.
+
+    total counts all content, unfiltered, and comes back on every page row
+    as an uncorrelated scalar subquery; only an empty page needs a second query.
+    """
+    with session_scope() as session:
+        # Plain row tuples: list rendering doesn't need ORM instances
+        total_count = select(func.count()).select_from(Content).scalar_subquery()
+        stmt = select(*_FEED_COLUMNS, total_count).order_by(Content.publish_date.desc())
         if content_type and content_type != "all":
-            query = query.filter(Content.content_type == content_type)
-        items = query.offset(offset).limit(limit).all()
-        
-        result = []
-        for item in items:
-            # Get tags for this item
-            theme_tags = session.query(ContentThemeTag).filter_by(content_id=item.id).all()
-            company_tags = session.query(ContentCompanyTag).filter_by(content_id=item.id).all()
-            
-            theme_ids = [t.theme_id for t in theme_tags]
-            company_ids = [c.company_id for c in company_tags]
-            
-            themes = session.query(Theme).filter(Theme.id.in_(theme_ids)).all() if theme_ids else []
-            companies = session.query(Company).filter(Company.id.in_(company_ids)).all() if company_ids else []
-            
-            result.append({
-                "id": item.id,
-                "title": item.title,
-                "url": item.source_url,
-                "source": item.source_name,
-                "type": item.content_type,
-                "date": item.publish_date.strftime("%b %d, %Y"),
-                "timestamp": item.publish_date.isoformat(),
-                "summary": item.summary[:200] + "..." if item.summary and len(item.summary) > 200 else item.summary,
-                "themes": [{"id": t.id, "name": t.name} for t in themes],
-                "companies": [{"id": c.id, "name": c.name} for c in companies],
-            })
-        
-        total = session.query(Content).count()
-        return {"items": result, "total": total}
+            stmt = stmt.where(Content.content_type == content_type)
+        rows = session.execute(stmt.offset(offset).limit(limit)).all()
+        refs = _tag_refs_by_content(session, [row[0] for row in rows])
+        total = rows[0][-1] if rows else session.scalar(select(total_count))
+
+    items = []
+    for item_id, title, url, source, item_type, published, summary, _ in rows:
+        if summary and len(summary) > FEED_SUMMARY_CHARS:
+            summary = summary[:FEED_SUMMARY_CHARS] + "..."
+        items.append({
+            "id": item_id,
+            "title": title,
+            "url": url,
+            "source": source,
+            "type": item_type,
+            "date": _fmt_date(published),
+            "timestamp": published.isoformat(),
+            "summary": summary,
+            **refs[item_id],
+        })
+    return {"items": items, "total": total}
 
 
 def get_content_item(content_id: int):
-    with SessionLocal() as session:
-        item = session.query(Content).filter_by(id=content_id).first()
-        if not item:
+    with session_scope() as session:
+        row = (
+            session.query(Content, func.substr(Content.raw_content, 1, 2000))
+            .options(defer(Content.raw_content), defer(Content.transcript), *_TAG_LOADERS)
+            .filter(Content.id == content_id)
+            .first()
+        )
+        if not row:
             return None
-        
-        theme_tags = session.query(ContentThemeTag).filter_by(content_id=item.id).all()
-        company_tags = session.query(ContentCompanyTag).filter_by(content_id=item.id).all()
-        
-        theme_ids = [t.theme_id for t in theme_tags]
-        company_ids = [c.company_id for c in company_tags]
-        
-        themes = session.query(Theme).filter(Theme.id.in_(theme_ids)).all() if theme_ids else []
-        companies = session.query(Company).filter(Company.id.in_(company_ids)).all() if company_ids else []
+        item, raw_content = row
         
         return {
             "id": item.id,
@@ -80,51 +176,62 @@ def get_content_item(content_id: int):
             "url": item.source_url,
             "source": item.source_name,
             "type": item.content_type,
-            "date": item.publish_date.strftime("%b %d, %Y"),
+            "date": _fmt_date(item.publish_date),
             "summary": item.summary,
-            "raw_content": item.raw_content[:2000] if item.raw_content else None,
-            "themes": [{"id": t.id, "name": t.name} for t in themes],
-            "companies": [{"id": c.id, "name": c.name} for c in companies],
+            "raw_content": raw_content or None,
+            **_tag_refs(item),
         }
 
 
 # === Theme API ===
 
-def get_themes():
-    with SessionLocal() as session:
-        themes = session.query(Theme).order_by(Theme.name).all()
-        result = []
-        for t in themes:
-            count = session.query(ContentThemeTag).filter_by(theme_id=t.id).count()
-            result.append({
-                "id": t.id,
-                "name": t.name,
-                "description": t.description,
+def get_themes(limit: Optional[int] = None, offset: int = 0):
+    counts = (
+        select(ContentThemeTag.theme_id, func.count().label("n"))
+        .group_by(ContentThemeTag.theme_id)
+        .subquery()
+    )
+    with session_scope() as session:
+        rows = session.execute(
+            select(Theme.id, Theme.name, Theme.description, func.coalesce(counts.c.n, 0))
+            .outerjoin(counts, counts.c.theme_id == Theme.id)
+            .order_by(Theme.name)
+            .offset(offset)
+            .limit(limit)
+        )
+        return [
+            {
+                "id": theme_id,
+                "name": name,
+                "description": description,
                 "content_count": count,
-            })
-        return result
+            }
+            for theme_id, name, description, count in rows
+        ]
 
 
 def get_theme(theme_id: int):
-    with SessionLocal() as session:
+    with session_scope() as session:
         theme = session.query(Theme).filter_by(id=theme_id).first()
         if not theme:
             return None
         
-        tags = session.query(ContentThemeTag).filter_by(theme_id=theme_id).all()
-        content_ids = [t.content_id for t in tags]
-        
-        items = []
-        if content_ids:
-            contents = session.query(Content).filter(Content.id.in_(content_ids)).order_by(Content.publish_date.desc()).all()
-            items = [{
-                "id": c.id,
-                "title": c.title,
-                "url": c.source_url,
-                "source": c.source_name,
-                "type": c.content_type,
-                "date": c.publish_date.strftime("%b %d, %Y"),
-            } for c in contents]
+        contents = (
+            session.query(Content)
+            .options(_LIST_COLUMNS)
+            .join(ContentThemeTag, ContentThemeTag.content_id == Content.id)
+            .filter(ContentThemeTag.theme_id == theme_id)
+            .order_by(Content.publish_date.desc())
+            .all()
+        )
+        items = [{
+            "id": c.id,
+            "title": c.title,
+            "url": c.source_url,
+            "source": c.source_name,
+            "type": c.content_type,
+            "date": _fmt_date(c.publish_date),
+        } for c in contents]
         
         return {
             "id": theme.id,
@@ -136,7 +243,7 @@ def get_theme(theme_id: int):
 
 
 def create_theme(name: str, description: str = None):
-    with SessionLocal() as session:
+    with session_scope() as session:
         existing = session.query(Theme).filter_by(name=name).first()
         if existing:
             return {"id": existing.id, "name": existing.name, "exists": True}
@@ -148,7 +255,7 @@ def create_theme(name: str, description: str = None):
 
 
 def update_theme(theme_id: int, name: str = None, description: str = None):
-    with SessionLocal() as session:
+    with session_scope() as session:
         theme = session.query(Theme).filter_by(id=theme_id).first()
         if not theme:
             return None
@@ -161,8 +268,8 @@ def update_theme(theme_id: int, name: str = None, description: str = None):
 
 
 def delete_theme(theme_id: int):
-    with SessionLocal() as session:
-        session.query(ContentThemeTag).filter_by(theme_id=theme_id).delete()
+    with session_scope() as session:
+        # Its tags go with it (ON DELETE CASCADE)
         session.query(Theme).filter_by(id=theme_id).delete()
         session.commit()
         return True
@@ -170,51 +277,75 @@ def delete_theme(theme_id: int):
 
 # === Company API ===
 
-def get_companies():
-    with SessionLocal() as session:
-        companies = session.query(Company).order_by(Company.name).all()
-        result = []
-        for c in companies:
-            count = session.query(ContentCompanyTag).filter_by(company_id=c.id).count()
-            lead_count = session.query(Lead).filter_by(company_id=c.id).count()
-            result.append({
-                "id": c.id,
-                "name": c.name,
-                "website": c.website,
-                "status": c.status,
+def get_companies(limit: Optional[int] = None, offset: int = 0):
+    content_counts = (
+        select(ContentCompanyTag.company_id, func.count().label("n"))
+        .group_by(ContentCompanyTag.company_id)
+        .subquery()
+    )
+    lead_counts = (
+        select(Lead.company_id, func.count().label("n"))
+        .group_by(Lead.company_id)
+        .subquery()
+    )
+    with session_scope() as session:
+        rows = session.execute(
+            select(
+                Company.id,
+                Company.name,
+                Company.website,
+                Company.status,
+                func.coalesce(content_counts.c.n, 0),
+                func.coalesce(lead_counts.c.n, 0),
+            )
+            .outerjoin(content_counts, content_counts.c.company_id == Company.id)
+            .outerjoin(lead_counts, lead_counts.c.company_id == Company.id)
+            .order_by(Company.name)
+            .offset(offset)
+            .limit(limit)
+        )
+        return [
+            {
+                "id": company_id,
+                "name": name,
+                "website": website,
+                "status": status,
                 "content_count": count,
                 "lead_count": lead_count,
-            })
-        return result
+            }
+            for company_id, name, website, status, count, lead_count in rows
+        ]
 
 
 def get_company(company_id: int):
-    with SessionLocal() as session:
+    with session_scope() as session:
         company = session.query(Company).filter_by(id=company_id).first()
         if not company:
             return None
         
-        tags = session.query(ContentCompanyTag).filter_by(company_id=company_id).all()
-        content_ids = [t.content_id for t in tags]
-        
-        items = []
-        if content_ids:
-            contents = session.query(Content).filter(Content.id.in_(content_ids)).order_by(Content.publish_date.desc()).all()
-            items = [{
-                "id": c.id,
-                "title": c.title,
-                "url": c.source_url,
-                "source": c.source_name,
-                "type": c.content_type,
-                "date": c.publish_date.strftime("%b %d, %Y"),
-            } for c in contents]
+        contents = (
+            session.query(Content)
+            .options(_LIST_COLUMNS)
+            .join(ContentCompanyTag, ContentCompanyTag.content_id == Content.id)
+            .filter(ContentCompanyTag.company_id == company_id)
+            .order_by(Content.publish_date.desc())
+            .all()
+        )
+        items = [{
+            "id": c.id,
+            "title": c.title,
+            "url": c.source_url,
+            "source": c.source_name,
+            "type": c.content_type,
+            "date": _fmt_date(c.publish_date),
+        } for c in contents]
         
         leads = session.query(Lead).filter_by(company_id=company_id).order_by(Lead.created_at.desc()).all()
         lead_list = [{
             "id": l.id,
             "stage": l.stage,
             "why_now": l.why_now,
-            "created_at": l.created_at.strftime("%b %d, %Y"),
+            "created_at": _fmt_date(l.created_at),
         } for l in leads]
         
         return {
@@ -230,7 +361,7 @@ def get_company(company_id: int):
 
 
 def create_company(name: str, website: str = None, status: str = "Watch"):
-    with SessionLocal() as session:
+    with session_scope() as session:
         existing = session.query(Company).filter_by(name=name).first()
         if existing:
             return {"id": existing.id, "name": existing.name, "exists": True}
@@ -242,7 +373,7 @@ def create_company(name: str, website: str = None, status: str = "Watch"):
 
 
 def update_company(company_id: int, name: str = None, website: str = None, notes: str = None, status: str = None):
-    with SessionLocal() as session:
+    with session_scope() as session:
         company = session.query(Company).filter_by(id=company_id).first()
         if not company:
             return None
@@ -259,9 +390,8 @@ def update_company(company_id: int, name: str = None, website: str = None, notes
 
 
 def delete_company(company_id: int):
-    with SessionLocal() as session:
-        session.query(ContentCompanyTag).filter_by(company_id=company_id).delete()
-        session.query(Lead).filter_by(company_id=company_id).delete()
+    with session_scope() as session:
+        # Tags, leads and the leads' actions cascade in the database
         session.query(Company).filter_by(id=company_id).delete()
         session.commit()
         return True
@@ -269,53 +399,174 @@ def delete_company(company_id: int):
 
 # === Tagging API ===
 
+# (session, *args) -> result, run inside the batch's transaction
+_TagOp = Callable[..., Any]
+_QueuedOp = tuple[_TagOp, tuple[Any, ...], "Future[Any]"]
+_T = TypeVar("_T")
+
+
+class TagBatcher:
+    """Coalesce tag/untag writes from concurrent requests into one transaction.
+
+    Callers block on a Future until the batch holding their op commits, so
+    each request still sees its own result.
+    """
+
+    def __init__(self, max_batch_size: int = 64, max_wait_ms: int = 10) -> None:
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: queue.Queue[_QueuedOp] = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, op: Callable[..., _T], *args: Any) -> _T:
+        future: Future[_T] = Future()
+        self._ensure_worker()
+        self._queue.put((op, args, future))
+        return future.result()
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="tag-batcher", daemon=True)
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def _flush(self, batch: list[_QueuedOp]) -> None:
+        try:
+            with SessionLocal() as session:
+                results = [op(session, *args) for op, args, _ in batch]
+                session.commit()
+        except Exception as e:
+            logger.warning("tag_batch_failed", size=len(batch), error=str(e))
+            # Retry one op per transaction so a single bad op only fails its caller
+            for op, args, future in batch:
+                try:
+                    with SessionLocal() as session:
+                        result = op(session, *args)
+                        session.commit()
+                    future.set_result(result)
+                except Exception as op_error:
+                    future.set_exception(op_error)
+            return
+
+        for (_, _, future), result in zip(batch, results):
+            future.set_result(result)
+
+
+_tag_batcher = TagBatcher()
+
+
+def _submit_tag(op: Callable[..., _T], *args: Any) -> Optional[_T]:
+    """Run a tagging op on the batcher; None if the content or tag target doesn't exist."""
+    try:
+        return _tag_batcher.submit(op, *args)
+    except IntegrityError:
+        # Foreign key violation: unknown content, theme or company id
+        return None
+
+
+def _tag_theme(session: Session, content_id: int, theme_id: int) -> dict[str, Any]:
+    tag_id = session.execute(
+        insert_ignore(session, ContentThemeTag)
+        .values(content_id=content_id, theme_id=theme_id)
+        .returning(ContentThemeTag.id)
+    ).scalar()
+    return {"exists": True} if tag_id is None else {"id": tag_id}
+
+
+def _untag_theme(session: Session, content_id: int, theme_id: int) -> bool:
+    session.query(ContentThemeTag).filter_by(content_id=content_id, theme_id=theme_id).delete()
+    return True
+
+
+def _tag_company(session: Session, content_id: int, company_id: int) -> dict[str, Any]:
+    tag_id = session.execute(
+        insert_ignore(session, ContentCompanyTag)
+        .values(content_id=content_id, company_id=company_id)
+        .returning(ContentCompanyTag.id)
+    ).scalar()
+    return {"exists": True} if tag_id is None else {"id": tag_id}
+
+
+def _untag_company(session: Session, content_id: int, company_id: int) -> bool:
+    session.query(ContentCompanyTag).filter_by(
+        content_id=content_id, company_id=company_id
+    ).delete()
+    return True
+
+
+def _bulk_tag(
+    session: Session, content_id: int, theme_ids: list[int], company_ids: list[int]
+) -> dict[str, int]:
+    added: dict[str, int] = {}
+    for key, model, column, ids in (
+        ("themes", ContentThemeTag, "theme_id", theme_ids),
+        ("companies", ContentCompanyTag, "company_id", company_ids),
+    ):
+        added[key] = 0
+        if ids:
+            # One executemany INSERT per tag table; existing pairs are skipped.
+            # Core table insert, so the result carries rowcount.
+            result = session.connection().execute(
+                insert_ignore(session, table_of(model)),
+                [{"content_id": content_id, column: tag_id} for tag_id in dict.fromkeys(ids)],
+            )
+            added[key] = result.rowcount
+    return added
+
+
+def bulk_tag_content(
+    content_id: int, theme_ids: Iterable[int] = (), company_ids: Iterable[int] = ()
+) -> Optional[dict[str, int]]:
+    return _submit_tag(_bulk_tag, content_id, list(theme_ids), list(company_ids))
+
+
 def tag_content_theme(content_id: int, theme_id: int):
-    with SessionLocal() as session:
-        existing = session.query(ContentThemeTag).filter_by(content_id=content_id, theme_id=theme_id).first()
-        if existing:
-            return {"exists": True}
-        
-        tag = ContentThemeTag(content_id=content_id, theme_id=theme_id)
-        session.add(tag)
-        session.commit()
-        return {"id": tag.id}
+    return _submit_tag(_tag_theme, content_id, theme_id)
 
 
 def untag_content_theme(content_id: int, theme_id: int):
-    with SessionLocal() as session:
-        session.query(ContentThemeTag).filter_by(content_id=content_id, theme_id=theme_id).delete()
-        session.commit()
-        return True
+    return _tag_batcher.submit(_untag_theme, content_id, theme_id)
 
 
 def tag_content_company(content_id: int, company_id: int):
-    with SessionLocal() as session:
-        existing = session.query(ContentCompanyTag).filter_by(content_id=content_id, company_id=company_id).first()
-        if existing:
-            return {"exists": True}
-        
-        tag = ContentCompanyTag(content_id=content_id, company_id=company_id)
-        session.add(tag)
-        session.commit()
-        return {"id": tag.id}
+    return _submit_tag(_tag_company, content_id, company_id)
 
 
 def untag_content_company(content_id: int, company_id: int):
-    with SessionLocal() as session:
-        session.query(ContentCompanyTag).filter_by(content_id=content_id, company_id=company_id).delete()
-        session.commit()
-        return True
+    return _tag_batcher.submit(_untag_company, content_id, company_id)
 
 
 # === Lead API ===
 
-def get_leads():
-    with SessionLocal() as session:
-        leads = session.query(Lead).order_by(Lead.updated_at.desc()).all()
+def get_leads(limit: Optional[int] = None, offset: int = 0):
+    with session_scope() as session:
+        leads = (
+            session.query(Lead)
+            .options(selectinload(Lead.company), selectinload(Lead.source_content))
+            .order_by(Lead.updated_at.desc())
+            .offset(offset)
+            .limit(limit)
+            .all()
+        )
         result = []
         for l in leads:
-            company = session.query(Company).filter_by(id=l.company_id).first()
-            content = session.query(Content).filter_by(id=l.created_from_content_id).first() if l.created_from_content_id else None
+            company = l.company
+            content = l.source_content
             
             result.append({
                 "id": l.id,
@@ -324,21 +575,30 @@ def get_leads():
                 "why_now": l.why_now,
                 "owner_note": l.owner_note,
                 "source_content": {"id": content.id, "title": content.title} if content else None,
-                "created_at": l.created_at.strftime("%b %d, %Y"),
-                "updated_at": l.updated_at.strftime("%b %d, %Y"),
+                "created_at": _fmt_date(l.created_at),
+                "updated_at": _fmt_date(l.updated_at),
             })
         return result
 
 
 def get_lead(lead_id: int):
-    with SessionLocal() as session:
-        lead = session.query(Lead).filter_by(id=lead_id).first()
+    with session_scope() as session:
+        lead = (
+            session.query(Lead)
+            .options(
+                selectinload(Lead.company),
+                selectinload(Lead.source_content),
+                selectinload(Lead.actions),
+            )
+            .filter_by(id=lead_id)
+            .first()
+        )
         if not lead:
             return None
         
-        company = session.query(Company).filter_by(id=lead.company_id).first()
-        content = session.query(Content).filter_by(id=lead.created_from_content_id).first() if lead.created_from_content_id else None
-        actions = session.query(LeadAction).filter_by(lead_id=lead_id).order_by(LeadAction.created_at.desc()).all()
+        company = lead.company
+        content = lead.source_content
+        actions = lead.actions
         
         return {
             "id": lead.id,
@@ -358,26 +618,30 @@ def get_lead(lead_id: int):
                 "content": a.content,
                 "created_at": a.created_at.strftime("%b %d, %Y %H:%M"),
             } for a in actions],
-            "created_at": lead.created_at.strftime("%b %d, %Y"),
-            "updated_at": lead.updated_at.strftime("%b %d, %Y"),
+            "created_at": _fmt_date(lead.created_at),
+            "updated_at": _fmt_date(lead.updated_at),
         }
 
 
 def create_lead(company_id: int, content_id: int = None, why_now: str = None):
-    with SessionLocal() as session:
-        lead = Lead(
-            company_id=company_id,
-            created_from_content_id=content_id,
-            why_now=why_now,
-            stage="New",
-        )
-        session.add(lead)
-        session.commit()
-        return {"id": lead.id}
+    try:
+        with session_scope() as session:
+            lead = Lead(
+                company_id=company_id,
+                created_from_content_id=content_id,
+                why_now=why_now,
+                stage="New",
+            )
+            session.add(lead)
+            session.commit()
+            return {"id": lead.id}
+    except IntegrityError:
+        # Unknown company or source content id
+        return None
 
 
 def update_lead(lead_id: int, stage: str = None, why_now: str = None, owner_note: str = None):
-    with SessionLocal() as session:
+    with session_scope() as session:
         lead = session.query(Lead).filter_by(id=lead_id).first()
         if not lead:
             return None
@@ -392,8 +656,7 @@ def update_lead(lead_id: int, stage: str = None, why_now: str = None, owner_note
 
 
 def delete_lead(lead_id: int):
-    with SessionLocal() as session:
-        session.query(LeadAction).filter_by(lead_id=lead_id).delete()
+    with session_scope() as session:
         session.query(Lead).filter_by(id=lead_id).delete()
         session.commit()
         return True
@@ -402,75 +665,34 @@ def delete_lead(lead_id: int):
 # === Lead Actions API ===
 
 def create_lead_action(lead_id: int, action_type: str, content: str):
-    with SessionLocal() as session:
+    with session_scope() as session:
         action = LeadAction(lead_id=lead_id, action_type=action_type, content=content)
         session.add(action)
         session.commit()
         return {"id": action.id}
 
 
-def generate_questions(lead_id: int):
-    """Generate diligence questions for a lead"""
-    with SessionLocal() as session:
-        lead = session.query(Lead).filter_by(id=lead_id).first()
-        if not lead:
-            return None
-        
-        company = session.query(Company).filter_by(id=lead.company_id).first()
-        content = session.query(Content).filter_by(id=lead.created_from_content_id).first() if lead.created_from_content_id else None
-        
-        # Generate questions based on available info
-        questions = [
-            f"1. What is {company.name}'s current ARR and growth rate?",
-            f"2. Who are the founders and what's their relevant background?",
-            f"3. What's the competitive landscape and {company.name}'s differentiation?",
-            f"4. What's the go-to-market strategy and current customer base?",
-            f"5. What's the current funding status and runway?",
-            f"6. What are the key technical risks or moats?",
-            f"7. What's the team size and key hires needed?",
-            f"8. What's the path to profitability or next milestone?",
-        ]
-        
-        if content and content.summary:
-            questions.append(f"9. Based on recent news: {content.title[:50]}... - what's the strategic implication?")
-        
-        if lead.why_now:
-            questions.append(f"10. Follow up on 'why now': {lead.why_now[:100]}...")
-        
-        question_text = "\n".join(questions)
-        
-        action = LeadAction(lead_id=lead_id, action_type="Questions", content=question_text)
-        session.add(action)
-        session.commit()
-        
-        return {"id": action.id, "content": question_text}
+_QUESTION_TEMPLATES = (
+    "1. What is {name}'s current ARR and growth rate?",
+    "2. Who are the founders and what's their relevant background?",
+    "3. What's the competitive landscape and {name}'s differentiation?",
+    "4. What's the go-to-market strategy and current customer base?",
+    "5. What's the current funding status and runway?",
+    "6. What are the key technical risks or moats?",
+    "7. What's the team size and key hires needed?",
+    "8. What's the path to profitability or next milestone?",
+)
 
+_OUTREACH_OPENERS = {
+    "warm": "Hi there! I came across {name} and was really impressed by what you're building.",
+    "direct": (
+        "I'm reaching out because {name} caught my attention as a potential investment"
+        " opportunity."
+    ),
+}
+_DEFAULT_OPENER = "I hope this message finds you well. I wanted to reach out regarding {name}."
 
-def generate_outreach(lead_id: int, tone: str = "professional"):
-    """Generate outreach draft for a lead"""
-    with SessionLocal() as session:
-        lead = session.query(Lead).filter_by(id=lead_id).first()
-        if not lead:
-            return None
-        
-        company = session.query(Company).filter_by(id=lead.company_id).first()
-        content = session.query(Content).filter_by(id=lead.created_from_content_id).first() if lead.created_from_content_id else None
-        
-        # Generate outreach based on tone
-        if tone == "warm":
-            opener = f"Hi there! I came across {company.name} and was really impressed by what you're building."
-        elif tone == "direct":
-            opener = f"I'm reaching out because {company.name} caught my attention as a potential investment opportunity."
-        else:
-            opener = f"I hope this message finds you well. I wanted to reach out regarding {company.name}."
-        
-        hook = ""
-        if content:
-            hook = f"\n\nI recently saw the coverage in {content.source_name} about {content.title[:50]}... and it reinforced my interest in learning more."
-        elif lead.why_now:
-            hook = f"\n\n{lead.why_now}"
-        
-        outreach = f"""{opener}{hook}
+_OUTREACH_TEMPLATE = """{opener}{hook}
 
 I'm an investor focused on enterprise AI and would love to learn more about:
 - Your vision for the company
@@ -480,102 +702,186 @@ I'm an investor focused on enterprise AI and would love to learn more about:
 Would you have 20-30 minutes for a call in the coming weeks?
 
 Best regards"""
-        
-        action = LeadAction(lead_id=lead_id, action_type="OutreachDraft", content=outreach)
-        session.add(action)
-        session.commit()
-        
-        return {"id": action.id, "content": outreach}
+
+
+def _lead_context(lead_id: int) -> Optional[tuple[Lead, Optional[Company], Optional[Content]]]:
+    """(lead, company, source content) loaded and detached, or None."""
+    with session_scope() as session:
+        lead = (
+            session.query(Lead)
+            .options(
+                selectinload(Lead.company),
+                selectinload(Lead.source_content).load_only(
+                    Content.title, Content.source_name, Content.summary
+                ),
+            )
+            .filter_by(id=lead_id)
+            .first()
+        )
+        if not lead:
+            return None
+        return lead, lead.company, lead.source_content
+
+
+def generate_questions(lead_id: int):
+    """Generate diligence questions for a lead"""
+    context = _lead_context(lead_id)
+    if not context:
+        return None
+    lead, company, content = context
+
+    # Render before opening the write transaction
+    questions = [t.format(name=company.name) for t in _QUESTION_TEMPLATES]
+
+    if content and content.summary:
+        questions.append(
+            f"9. Based on recent news: {content.title[:50]}... - what's the strategic implication?"
+        )
+
+    if lead.why_now:
+        questions.append(f"10. Follow up on 'why now': {lead.why_now[:100]}...")
+
+    question_text = "\n".join(questions)
+
+    action = create_lead_action(lead_id, "Questions", question_text)
+    return {"id": action["id"], "content": question_text}
+
+
+def generate_outreach(lead_id: int, tone: str = "professional"):
+    """Generate outreach draft for a lead"""
+    context = _lead_context(lead_id)
+    if not context:
+        return None
+    lead, company, content = context
+
+    opener = _OUTREACH_OPENERS.get(tone, _DEFAULT_OPENER).format(name=company.name)
+
+    hook = ""
+    if content:
+        hook = (
+            f"\n\nI recently saw the coverage in {content.source_name} about"
+            f" {content.title[:50]}... and it reinforced my interest in learning more."
+        )
+    elif lead.why_now:
+        hook = f"\n\n{lead.why_now}"
+
+    outreach = _OUTREACH_TEMPLATE.format(opener=opener, hook=hook)
+
+    action = create_lead_action(lead_id, "OutreachDraft", outreach)
+    return {"id": action["id"], "content": outreach}
 
 
 # === Search API ===
 
+_SEARCH_KINDS = ("content", "theme", "company", "lead")
+
+
+def _search_statement(pattern: str, limit: int) -> Select[Any]:
+    """One UNION ALL over the four searchable tables, in result order.
+
+    Each branch keeps its own cap (content: limit, the rest: 10) and the
+    outer LIMIT stops the scan once ``limit`` rows have been produced.
+    """
+    if content_search_available():
+        # LIKE on the FTS5 trigram table is case-insensitive and indexed
+        matches = select(content_search.c.rowid).where(content_search.c.title.like(pattern))
+        title_match = Content.id.in_(matches)
+    else:
+        title_match = Content.title.ilike(pattern)
+
+    no_date = cast(null(), Content.publish_date.type)
+    branches = (
+        select(Content.id, Content.title, Content.source_name, Content.publish_date)
+        .where(title_match)
+        .order_by(Content.id)
+        .limit(limit),
+        select(Theme.id, Theme.name, Theme.description, no_date)
+        .where(Theme.name.ilike(pattern))
+        .order_by(Theme.id)
+        .limit(10),
+        select(Company.id, Company.name, Company.status, no_date)
+        .where(Company.name.ilike(pattern))
+        .order_by(Company.id)
+        .limit(10),
+        select(Lead.id, Company.name, Lead.stage, no_date)
+        .outerjoin(Company, Company.id == Lead.company_id)
+        .where(Lead.why_now.ilike(pattern) | Lead.owner_note.ilike(pattern))
+        .order_by(Lead.id)
+        .limit(10),
+    )
+    # Subqueries keep the per-branch ORDER BY/LIMIT legal inside UNION ALL
+    combined = union_all(
+        *(
+            select(literal(rank).label("kind"), *branch.subquery().c)
+            for rank, branch in enumerate(branches)
+        )
+    ).subquery()
+    kind, item_id = combined.c[0], combined.c[1]
+    return select(combined).order_by(kind, item_id).limit(limit)
+
+
 def search(query: str, limit: int = 20):
     if not query or len(query) < 2:
         return {"results": []}
-    
-    query_lower = f"%{query.lower()}%"
+
     results = []
-    
-    with SessionLocal() as session:
-        # Search content
-        contents = session.query(Content).filter(
-            Content.title.ilike(query_lower)
-        ).limit(limit).all()
-        
-        for c in contents:
+    with session_scope() as session:
+        rows = session.execute(_search_statement(f"%{query.lower()}%", limit))
+        for kind, item_id, title, detail, day in rows:
+            kind = _SEARCH_KINDS[kind]
+            if kind == "content":
+                subtitle = f"{detail} - {day.strftime('%b %d')}"
+                url = f"/content/{item_id}"
+            elif kind == "theme":
+                subtitle = detail or "Theme"
+                url = f"/themes/{item_id}"
+            elif kind == "company":
+                subtitle = f"Status: {detail}"
+                url = f"/companies/{item_id}"
+            else:
+                title = title or "Lead"
+                subtitle = f"Stage: {detail}"
+                url = f"/leads/{item_id}"
             results.append({
-                "type": "content",
-                "id": c.id,
-                "title": c.title,
-                "subtitle": f"{c.source_name} - {c.publish_date.strftime('%b %d')}",
-                "url": f"/content/{c.id}",
+                "type": kind,
+                "id": item_id,
+                "title": title,
+                "subtitle": subtitle,
+                "url": url,
             })
-        
-        # Search themes
-        themes = session.query(Theme).filter(
-            Theme.name.ilike(query_lower)
-        ).limit(10).all()
-        
-        for t in themes:
-            results.append({
-                "type": "theme",
-                "id": t.id,
-                "title": t.name,
-                "subtitle": t.description or "Theme",
-                "url": f"/themes/{t.id}",
-            })
-        
-        # Search companies
-        companies = session.query(Company).filter(
-            Company.name.ilike(query_lower)
-        ).limit(10).all()
-        
-        for c in companies:
-            results.append({
-                "type": "company",
-                "id": c.id,
-                "title": c.name,
-                "subtitle": f"Status: {c.status}",
-                "url": f"/companies/{c.id}",
-            })
-        
-        # Search leads
-        leads = session.query(Lead).filter(
-            Lead.why_now.ilike(query_lower) | Lead.owner_note.ilike(query_lower)
-        ).limit(10).all()
-        
-        for l in leads:
-            company = session.query(Company).filter_by(id=l.company_id).first()
-            results.append({
-                "type": "lead",
-                "id": l.id,
-                "title": company.name if company else "Lead",
-                "subtitle": f"Stage: {l.stage}",
-                "url": f"/leads/{l.id}",
-            })
-    
-    return {"results": results[:limit]}
+
+    return {"results": results}
 
 
 # === Stats API ===
 
 def get_stats():
-    with SessionLocal() as session:
-        content_count = session.query(Content).count()
-        article_count = session.query(Content).filter(Content.content_type == "article").count()
-        podcast_count = session.query(Content).filter(Content.content_type == "podcast").count()
-        theme_count = session.query(Theme).count()
-        company_count = session.query(Company).count()
-        lead_count = session.query(Lead).count()
-        tagged_count = session.query(ContentThemeTag).distinct(ContentThemeTag.content_id).count()
-        
-        return {
-            "content": content_count,
-            "articles": article_count,
-            "podcasts": podcast_count,
-            "themes": theme_count,
-            "companies": company_count,
-            "leads": lead_count,
-            "tagged": tagged_count,
-        }
+    def is_type(content_type: str) -> ColumnElement[int]:
+        return func.coalesce(func.sum(case((Content.content_type == content_type, 1), else_=0)), 0)
+
+    def count_of(
+        column: Union[ColumnElement[Any], InstrumentedAttribute[Any]],
+    ) -> ScalarSelect[int]:
+        return select(func.count(column)).scalar_subquery()
+
+    stmt = select(
+        func.count(Content.id),
+        is_type("article"),
+        is_type("podcast"),
+        count_of(Theme.id),
+        count_of(Company.id),
+        count_of(Lead.id),
+        count_of(func.distinct(ContentThemeTag.content_id)),
+    )
+    with session_scope() as session:
+        content, articles, podcasts, themes, companies, leads, tagged = session.execute(stmt).one()
+
+    return {
+        "content": content,
+        "articles": articles,
+        "podcasts": podcasts,
+        "themes": themes,
+        "companies": companies,
+        "leads": leads,
+        "tagged": tagged,
+    }
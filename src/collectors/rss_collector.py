@@ -1,45 +1,261 @@
-import json
+import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Any, Optional
 
 import feedparser
 import httpx
 import structlog
+from sqlalchemy import select
+from sqlalchemy.orm import Session
 from tenacity import retry, stop_after_attempt, wait_exponential
 
-from src.storage import Content, ContentType, SessionLocal
+from src.storage import (
+    MAX_RAW_CONTENT_CHARS,
+    Content,
+    ContentType,
+    FeedState,
+    SessionLocal,
+    existing_source_urls,
+    insert_contents,
+)
+
+# The lxml fast path reuses feedparser's private date parser and sanitizer
+# (pinned to feedparser 6.x in pyproject); if a release drops either, the
+# ImportError turns the fast path off instead of breaking collection
+try:
+    from feedparser.datetimes import _parse_date
+    from feedparser.sanitizer import _sanitize_html
+    from lxml import etree
+except ImportError:
+    etree = None
 
 logger = structlog.get_logger()
 
+MAX_FETCH_WORKERS = 16
+LOGGED_TITLES = 20
+
+_PODCAST_FEED = re.compile(r"podcast|20vc|a16z", re.IGNORECASE)
+
+
+def _first_audio(items: list[dict[str, Any]]) -> Optional[dict[str, Any]]:
+    for item in items:
+        if item.get("type", "").startswith("audio/"):
+            return item
+    return None
+
+
+_ATOM = "{http://www.w3.org/2005/Atom}"
+_CONTENT_ENCODED = "{http://purl.org/rss/1.0/modules/content/}encoded"
+_DC_CREATOR = "{http://purl.org/dc/elements/1.1/}creator"
+_ITUNES_AUTHOR = "{http://www.itunes.com/dtds/podcast-1.0.dtd}author"
+
+if etree is not None:
+    _XML_PARSER = etree.XMLParser(resolve_entities=False, no_network=True)
+
+
+class _UnsupportedFeedError(Exception):
+    """Raised by the fast parser for input it leaves to feedparser."""
+
+
+def _plain(el: Any) -> Optional[str]:
+    if el is None:
+        return None
+    text = (el.text or "").strip()
+    if len(el) or "<" in text:
+        # Markup in a plain-text field: leave the escaping rules to feedparser
+        raise _UnsupportedFeedError
+    return text
+
+
+def _html(el: Any) -> Optional[str]:
+    if el is None:
+        return None
+    if len(el):
+        raise _UnsupportedFeedError
+    text = (el.text or "").strip()
+    if "<" in text:
+        text = _sanitize_html(text, "utf-8", "text/html")
+    return text
+
+
+def _date(el: Any) -> Optional[tuple[str, object]]:
+    if el is None or not el.text:
+        return None
+    value = el.text.strip()
+    return value, _parse_date(value)
+
+
+def _link(rel: str, link_type: str, href: str, el: Any) -> dict[str, str]:
+    link = {"rel": rel, "type": link_type, "href": href}
+    if el.get("length"):
+        link["length"] = el.get("length")
+    return link
+
+
+def _entry(**fields: Any) -> feedparser.FeedParserDict:
+    entry = feedparser.FeedParserDict()
+    for key, value in fields.items():
+        if value is not None:
+            entry[key] = value
+    return entry
+
+
+def _rss_item(item: Any) -> feedparser.FeedParserDict:
+    links = []
+    link = _plain(item.find("link"))
+    if not link:
+        guid = item.find("guid")
+        if guid is not None and guid.get("isPermaLink", "true") == "true":
+            link = _plain(guid)
+    if link:
+        links.append({"rel": "alternate", "type": "text/html", "href": link})
+    for enclosure in item.iterfind("enclosure"):
+        links.append(
+            _link("enclosure", enclosure.get("type", ""), enclosure.get("url", ""), enclosure)
+        )
+
+    encoded = item.find(_CONTENT_ENCODED)
+    published = _date(item.find("pubDate"))
+    author = _plain(item.find(_DC_CREATOR))
+    if author is None:
+        author = _plain(item.find("author")) or _plain(item.find(_ITUNES_AUTHOR))
+    return _entry(
+        title=_html(item.find("title")),
+        link=link,
+        links=links,
+        author=author,
+        published=published and published[0],
+        published_parsed=published and published[1],
+        summary=_html(item.find("description")),
+        content=None if encoded is None else [{"type": "text/html", "value": _html(encoded)}],
+    )
+
+
+def _atom_text(el: Any) -> Optional[str]:
+    if el is None:
+        return None
+    kind = el.get("type", "text")
+    if kind == "text":
+        return _plain(el)
+    if kind == "html":
+        return _html(el)
+    raise _UnsupportedFeedError
+
+
+def _atom_entry(entry: Any) -> feedparser.FeedParserDict:
+    links = []
+    link = None
+    for el in entry.iterfind(_ATOM + "link"):
+        rel = el.get("rel", "alternate")
+        item = _link(rel, el.get("type", "text/html"), el.get("href", ""), el)
+        links.append(item)
+        if rel == "alternate" and link is None:
+            link = item["href"]
+
+    content = entry.find(_ATOM + "content")
+    if content is not None and content.get("src"):
+        raise _UnsupportedFeedError
+    published = _date(entry.find(_ATOM + "published"))
+    updated = _date(entry.find(_ATOM + "updated"))
+    return _entry(
+        title=_atom_text(entry.find(_ATOM + "title")),
+        link=link,
+        links=links,
+        author=_plain(entry.find(f"{_ATOM}author/{_ATOM}name")),
+        published=published and published[0],
+        published_parsed=published and published[1],
+        updated=updated and updated[0],
+        updated_parsed=updated and updated[1],
+        summary=_atom_text(entry.find(_ATOM + "summary")),
+        content=None if content is None else [
+            {"type": "text/html", "value": _atom_text(content) or ""}
+        ],
+    )
+
+
+def _fast_parse(xml: bytes) -> Optional[feedparser.FeedParserDict]:
+    """Parse plain RSS 2.0 / Atom with lxml into the fields collect_from_feed reads.
+
+    Returns None when lxml is unavailable or the document uses anything
+    the fast path doesn't model (markup in text fields, xhtml content,
+    other feed formats); the caller then falls back to feedparser.
+    """
+    if etree is None:
+        return None
+    try:
+        root = etree.fromstring(xml, _XML_PARSER)
+        if root.tag == "rss":
+            channel = root.find("channel")
+            if channel is None:
+                return None
+            title = _plain(channel.find("title"))
+            entries = [_rss_item(item) for item in channel.iterfind("item")]
+        elif root.tag == _ATOM + "feed":
+            title = _plain(root.find(_ATOM + "title"))
+            entries = [_atom_entry(entry) for entry in root.iterfind(_ATOM + "entry")]
+        else:
+            return None
+    except (etree.XMLSyntaxError, _UnsupportedFeedError, ValueError):
+        return None
+    return feedparser.FeedParserDict(feed=_entry(title=title), entries=entries, bozo=False)
+
 
 class RSSCollector:
-    def __init__(self):
+    def __init__(self) -> None:
         self.client = httpx.Client(timeout=30.0, follow_redirects=True)
 
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
-    def fetch_feed(self, url: str) -> feedparser.FeedParserDict:
-        response = self.client.get(url)
+    def fetch_feed(
+        self, url: str, etag: Optional[str] = None, modified: Optional[str] = None
+    ) -> feedparser.FeedParserDict:
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if modified:
+            headers["If-Modified-Since"] = modified
+
+        response = self.client.get(url, headers=headers)
+        if response.status_code == 304:
+            # Unchanged since the last fetch: skip the download and the parse
+            return feedparser.FeedParserDict(feed={}, entries=[], status=304)
         response.raise_for_status()
-        return feedparser.parse(response.text)
-
-    def determine_content_type(self, entry: dict, feed_title: str) -> ContentType:
-        feed_lower = feed_title.lower()
-        if "podcast" in feed_lower or "20vc" in feed_lower or "a16z" in feed_lower:
-            return ContentType.PODCAST
-        if entry.get("enclosures") or entry.get("links"):
-            for link in entry.get("links", []):
-                if link.get("type", "").startswith("audio/"):
-                    return ContentType.PODCAST
-        return ContentType.ARTICLE
-
-    def parse_publish_date(self, entry: dict) -> datetime:
+
+        # Raw bytes: feedparser sniffs the encoding itself (using the HTTP
+        # Content-Type as a hint), so the body is never decoded to str first
+        parsed = _fast_parse(response.content) or feedparser.parse(
+            response.content, response_headers=dict(response.headers)
+        )
+        parsed["etag"] = response.headers.get("ETag")
+        parsed["modified"] = response.headers.get("Last-Modified")
+        return parsed
+
+    def is_podcast_feed(self, feed_title: str) -> bool:
+        return _PODCAST_FEED.search(feed_title) is not None
+
+    def classify_entry(
+        self, entry: dict[str, Any], podcast_feed: bool
+    ) -> tuple[ContentType, Optional[str]]:
+        """Return (content_type, audio_url), walking links and enclosures once each."""
+        audio_link = _first_audio(entry.get("links", []))
+        if podcast_feed or audio_link is not None:
+            content_type = ContentType.PODCAST
+        else:
+            content_type = ContentType.ARTICLE
+        audio = _first_audio(entry.get("enclosures", [])) or audio_link
+        return content_type, audio.get("href") if audio else None
+
+    def determine_content_type(self, entry: dict[str, Any], feed_title: str) -> ContentType:
+        return self.classify_entry(entry, self.is_podcast_feed(feed_title))[0]
+
+    def parse_publish_date(self, entry: dict[str, Any]) -> datetime:
         if hasattr(entry, "published_parsed") and entry.published_parsed:
             return datetime(*entry.published_parsed[:6], tzinfo=timezone.utc)
         if hasattr(entry, "updated_parsed") and entry.updated_parsed:
             return datetime(*entry.updated_parsed[:6], tzinfo=timezone.utc)
         return datetime.now(timezone.utc)
 
-    def extract_content(self, entry: dict) -> Optional[str]:
+    def extract_content(self, entry: dict[str, Any]) -> Optional[str]:
         if hasattr(entry, "content") and entry.content:
             return entry.content[0].get("value", "")
         if hasattr(entry, "summary"):
@@ -48,75 +264,154 @@ class RSSCollector:
             return entry.description
         return None
 
-    def get_audio_url(self, entry: dict) -> Optional[str]:
-        for enclosure in entry.get("enclosures", []):
-            if enclosure.get("type", "").startswith("audio/"):
-                return enclosure.get("href")
-        for link in entry.get("links", []):
-            if link.get("type", "").startswith("audio/"):
-                return link.get("href")
-        return None
+    def get_audio_url(self, entry: dict[str, Any]) -> Optional[str]:
+        audio = _first_audio(entry.get("enclosures", [])) or _first_audio(entry.get("links", []))
+        return audio.get("href") if audio else None
 
-    def collect_from_feed(self, feed_name: str, feed_url: str) -> list[Content]:
+    def _fetch(
+        self, feed_name: str, feed_url: str, state: Optional[FeedState] = None
+    ) -> Optional[feedparser.FeedParserDict]:
         logger.info("collecting_feed", feed_name=feed_name, url=feed_url)
-        collected = []
-
         try:
-            feed = self.fetch_feed(feed_url)
+            if state is None:
+                feed = self.fetch_feed(feed_url)
+            else:
+                feed = self.fetch_feed(feed_url, state.etag, state.last_modified)
         except Exception as e:
             logger.error("feed_fetch_failed", feed_name=feed_name, error=str(e))
-            return collected
+            return None
+
+        if feed.get("status") == 304:
+            logger.info("feed_not_modified", feed_name=feed_name)
+        return feed
 
+    def _load_feed_states(self, feed_urls: list[str]) -> dict[str, FeedState]:
         with SessionLocal() as session:
-            for entry in feed.entries:
-                source_url = entry.get("link", "")
-                if not source_url:
-                    continue
+            return {
+                state.feed_url: state
+                for state in session.scalars(
+                    select(FeedState).where(FeedState.feed_url.in_(feed_urls))
+                )
+            }
 
-                existing = session.query(Content).filter_by(source_url=source_url).first()
-                if existing:
-                    continue
+    def _save_feed_state(
+        self,
+        session: Session,
+        feed_url: str,
+        feed: feedparser.FeedParserDict,
+        states: dict[str, FeedState],
+    ) -> None:
+        if feed.get("status") == 304:
+            return
+        state = states.get(feed_url)
+        etag, modified = feed.get("etag"), feed.get("modified")
+        if state is None:
+            if not (etag or modified):
+                return
+            state = states[feed_url] = FeedState(feed_url=feed_url)
+        state.etag = etag
+        state.last_modified = modified
+        session.add(state)
 
-                content_type = self.determine_content_type(entry, feed.feed.get("title", feed_name))
-                publish_date = self.parse_publish_date(entry)
-                raw_content = self.extract_content(entry)
-
-                content = Content(
-                    source_name=feed_name,
-                    source_url=source_url,
-                    content_type=content_type,
-                    title=entry.get("title", "Untitled"),
-                    author=entry.get("author"),
-                    publish_date=publish_date,
-                    raw_content=raw_content,
-                    processed=False,
-                )
+    def store_feed(
+        self, session: Session, feed_name: str, feed: feedparser.FeedParserDict
+    ) -> list[Content]:
+        """Insert the feed's new entries through ``session`` and return them; the caller commits."""
+        if not feed.entries:
+            return []
 
-                if content_type == ContentType.PODCAST:
-                    audio_url = self.get_audio_url(entry)
-                    if audio_url:
-                        content.entities = json.dumps({"audio_url": audio_url})
-
-                session.add(content)
-                collected.append(content)
-                logger.info(
-                    "content_collected",
-                    title=content.title,
-                    content_type=content_type,
-                    source=feed_name,
-                )
+        podcast_feed = self.is_podcast_feed(feed.feed.get("title", feed_name))
+
+        urls = [entry.get("link", "") for entry in feed.entries]
+        seen = existing_source_urls(session, urls)
+
+        rows = []
+        for entry, source_url in zip(feed.entries, urls):
+            if not source_url or source_url in seen:
+                continue
+            seen.add(source_url)
+
+            content_type, audio_url = self.classify_entry(entry, podcast_feed)
+            publish_date = self.parse_publish_date(entry)
+            raw_content = self.extract_content(entry)
+            if raw_content:
+                raw_content = raw_content[:MAX_RAW_CONTENT_CHARS]
+
+            title = entry.get("title", "Untitled")
+            rows.append({
+                "source_name": feed_name,
+                "source_url": source_url,
+                "content_type": content_type,
+                "title": title,
+                "author": entry.get("author"),
+                "publish_date": publish_date,
+                "raw_content": raw_content,
+                # Same keys on every row keeps the feed in one executemany
+                "entities": (
+                    {"audio_url": audio_url}
+                    if content_type == ContentType.PODCAST and audio_url
+                    else None
+                ),
+                "processed": False,
+            })
+            logger.debug(
+                "content_collected", title=title, content_type=content_type, source=feed_name
+            )
+
+        return insert_contents(session, rows)
+
+    def _log_feed_collected(self, feed_name: str, titles: list[str], count: int) -> None:
+        # One summary line per feed; per-entry lines are debug-level
+        logger.info("feed_collected", feed_name=feed_name, count=count, titles=titles)
+
+    def collect_from_feed(self, feed_name: str, feed_url: str) -> list[Content]:
+        states = self._load_feed_states([feed_url])
+        feed = self._fetch(feed_name, feed_url, states.get(feed_url))
+        if feed is None:
+            return []
 
+        with SessionLocal() as session:
+            collected = self.store_feed(session, feed_name, feed)
+            # Read before commit expires the instances
+            titles = [content.title for content in collected[:LOGGED_TITLES]]
+            self._save_feed_state(session, feed_url, feed, states)
             session.commit()
+        self._log_feed_collected(feed_name, titles, len(collected))
 
         return collected
 
     def collect_all(self, feeds: list[dict[str, str]]) -> list[Content]:
         all_collected = []
-        for feed in feeds:
-            collected = self.collect_from_feed(feed["name"], feed["url"])
-            all_collected.extend(collected)
+        if not feeds:
+            logger.info("collection_complete", total_items=0)
+            return all_collected
+
+        # Fetching is network-bound and httpx.Client is thread-safe, so pull
+        # every feed concurrently; parsing results are then written in order
+        states = self._load_feed_states([feed["url"] for feed in feeds])
+        with ThreadPoolExecutor(max_workers=min(MAX_FETCH_WORKERS, len(feeds))) as pool:
+            fetched = list(
+                pool.map(lambda f: self._fetch(f["name"], f["url"], states.get(f["url"])), feeds)
+            )
+
+        with SessionLocal() as session:
+            for feed, parsed in zip(feeds, fetched):
+                if parsed is None:
+                    continue
+                try:
+                    collected = self.store_feed(session, feed["name"], parsed)
+                    titles = [content.title for content in collected[:LOGGED_TITLES]]
+                    self._save_feed_state(session, feed["url"], parsed, states)
+                    session.commit()
+                except Exception as e:
+                    session.rollback()
+                    logger.error("feed_store_failed", feed_name=feed["name"], error=str(e))
+                    continue
+                all_collected.extend(collected)
+                self._log_feed_collected(feed["name"], titles, len(collected))
+
         logger.info("collection_complete", total_items=len(all_collected))
         return all_collected
 
-    def close(self):
+    def close(self) -> None:
         self.client.close()
@@ -1,23 +1,86 @@
+import asyncio
+from collections.abc import Iterable
 from datetime import datetime, timezone
-from typing import Optional
-from urllib.parse import urljoin, urlparse
+from typing import Any, Optional
 
 import httpx
 import structlog
-from bs4 import BeautifulSoup
+from sqlalchemy.orm import Session
 from tenacity import retry, stop_after_attempt, wait_exponential
 
-from src.storage import Content, ContentType, SessionLocal
+from src.storage import Content, ContentType, SessionLocal, existing_source_urls, insert_contents
+
+try:
+    import h2
+except ImportError:
+    h2 = None
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
 
 logger = structlog.get_logger()
 
+MAX_CONCURRENT_FETCHES = 20
+MAX_CONTENT_CHARS = 50000
+
+_STRIPPED_TAGS = ("script", "style", "nav", "footer", "header", "aside")
+# Characters handed to the HTML parser between checks for a finished <article>
+_FEED_CHUNK = 64 * 1024
+
+if etree is not None:
+    _OG_TITLE = etree.XPath('//meta[@property="og:title"]')
+    _AUTHOR_META = etree.XPath('//meta[@name="author"]')
+    _AUTHOR_CLASS = etree.XPath(
+        '(//*[contains(translate(@class, "AUTHOR", "author"), "author")])[1]'
+    )
+    _TIME = etree.XPath("string((//time)[1]/@datetime)")
+    # Same precedence as the BeautifulSoup path: article, then main,
+    # .content, #content; every paragraph when none match
+    _BODY = tuple(
+        etree.XPath(path)
+        for path in (
+            "(//article)[1]",
+            "(//main)[1]",
+            '(//*[contains(concat(" ", normalize-space(@class), " "), " content ")])[1]',
+            '(//*[@id="content"])[1]',
+        )
+    )
+
+# Shared by the sync and async clients: keep connections to each article
+# host open between requests, and multiplex over HTTP/2 when h2 is installed
+_CLIENT_OPTIONS: dict[str, Any] = {
+    "http2": h2 is not None,
+    "limits": httpx.Limits(
+        max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0
+    ),
+    "timeout": httpx.Timeout(30.0, connect=10.0),
+    "follow_redirects": True,
+}
+
+
+def _joined_text(element: Any, separator: str) -> str:
+    # BeautifulSoup's get_text(separator, strip=True): stripped, non-empty strings
+    return separator.join(
+        text.strip() for text in element.itertext() if text.strip()
+    )
+
+
+def _is_body_article(element: Any) -> bool:
+    return not any(
+        ancestor.tag == "article" or ancestor.tag in _STRIPPED_TAGS
+        for ancestor in element.iterancestors()
+    )
+
 
 class WebScraper:
     def __init__(self, auth_cookies: Optional[dict] = None):
-        headers = {
+        self.headers = {
             "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
         }
-        self.client = httpx.Client(timeout=30.0, follow_redirects=True, headers=headers)
+        self.auth_cookies = auth_cookies or {}
+        self.client = httpx.Client(headers=self.headers, **_CLIENT_OPTIONS)
         if auth_cookies:
             self.client.cookies.update(auth_cookies)
 
@@ -27,10 +90,13 @@ class WebScraper:
         response.raise_for_status()
         return response.text
 
-    def extract_article_content(self, html: str, url: str) -> dict:
+    def _soup_fields(self, html: str) -> tuple[str, str, str, str]:
+        # Fallback path only, so bs4 isn't loaded until it's needed
+        from bs4 import BeautifulSoup
+
         soup = BeautifulSoup(html, "html.parser")
 
-        for tag in soup(["script", "style", "nav", "footer", "header", "aside"]):
+        for tag in soup(list(_STRIPPED_TAGS)):
             tag.decompose()
 
         title = ""
@@ -48,15 +114,8 @@ class WebScraper:
         if author_tag and not author:
             author = author_tag.get_text(strip=True)
 
-        publish_date = None
         time_tag = soup.find("time")
-        if time_tag and time_tag.get("datetime"):
-            try:
-                publish_date = datetime.fromisoformat(
-                    time_tag["datetime"].replace("Z", "+00:00")
-                )
-            except ValueError:
-                pass
+        published = str(time_tag.get("datetime", "")) if time_tag else ""
 
         article = soup.find("article")
         if article:
@@ -69,42 +128,115 @@ class WebScraper:
                 paragraphs = soup.find_all("p")
                 content = "\n".join(p.get_text(strip=True) for p in paragraphs)
 
+        return title, author, published, content
+
+    def _parse_until_article(self, html: str) -> Any:
+        # Feed the page in chunks and stop once the first top-level <article>
+        # outside the stripped sections has closed: it is the preferred
+        # body, so the rest of a long page never gets parsed
+        parser = etree.HTMLPullParser(events=("end",), tag="article")
+        for start in range(0, len(html), _FEED_CHUNK):
+            parser.feed(html[start:start + _FEED_CHUNK])
+            if any(_is_body_article(element) for _, element in parser.read_events()):
+                break
+        return parser.close()
+
+    def _lxml_fields(self, html: str) -> tuple[str, str, str, str]:
+        tree = self._parse_until_article(html)
+        etree.strip_elements(tree, *_STRIPPED_TAGS, with_tail=False)
+
+        title = tree.findtext(".//title") or ""
+        og_title = _OG_TITLE(tree)
+        if og_title:
+            title = og_title[0].get("content", title)
+
+        author = ""
+        author_meta = _AUTHOR_META(tree)
+        if author_meta:
+            author = author_meta[0].get("content", "")
+        if not author:
+            author_tag = _AUTHOR_CLASS(tree)
+            if author_tag:
+                author = _joined_text(author_tag[0], "")
+
+        published = _TIME(tree)
+
+        for body in _BODY:
+            found = body(tree)
+            if found:
+                content = _joined_text(found[0], "\n")
+                break
+        else:
+            content = "\n".join(_joined_text(p, "") for p in tree.iter("p"))
+
+        return title, author, published, content
+
+    def extract_article_content(self, html: str, url: str) -> dict[str, Any]:
+        fields = None
+        if etree is not None:
+            try:
+                fields = self._lxml_fields(html)
+            except etree.LxmlError:
+                # Empty documents and other input libxml2 gives up on
+                pass
+        title, author, published, content = fields or self._soup_fields(html)
+
+        publish_date = None
+        if published:
+            try:
+                publish_date = datetime.fromisoformat(published.replace("Z", "+00:00"))
+            except ValueError:
+                pass
+
         return {
             "title": title,
             "author": author,
             "publish_date": publish_date or datetime.now(timezone.utc),
-            "content": content[:50000],  # Limit content size
+            "content": content[:MAX_CONTENT_CHARS],
         }
 
-    def scrape_article(self, url: str, source_name: str) -> Optional[Content]:
+    def _article_row(self, html: str, url: str, source_name: str) -> dict[str, Any]:
+        extracted = self.extract_article_content(html, url)
+        return {
+            "source_name": source_name,
+            "source_url": url,
+            "content_type": ContentType.ARTICLE,
+            "title": extracted["title"],
+            "author": extracted["author"],
+            "publish_date": extracted["publish_date"],
+            "raw_content": extracted["content"],
+            "processed": False,
+        }
+
+    def _existing(self, session: Session, urls: Iterable[str]) -> set[str]:
+        existing = existing_source_urls(session, urls)
+        for url in existing:
+            logger.info("article_exists", url=url)
+        return existing
+
+    def scrape_article(
+        self, url: str, source_name: str, session: Optional[Session] = None
+    ) -> Optional[Content]:
+        """Scrape and store one article; with ``session`` given, the caller commits."""
+        if session is None:
+            with SessionLocal(expire_on_commit=False) as session:
+                content = self.scrape_article(url, source_name, session)
+                session.commit()
+                return content
+
         logger.info("scraping_article", url=url, source=source_name)
 
-        with SessionLocal() as session:
-            existing = session.query(Content).filter_by(source_url=url).first()
-            if existing:
-                logger.info("article_exists", url=url)
-                return None
+        if self._existing(session, [url]):
+            return None
 
         try:
             html = self.fetch_page(url)
-            extracted = self.extract_article_content(html, url)
-
-            content = Content(
-                source_name=source_name,
-                source_url=url,
-                content_type=ContentType.ARTICLE,
-                title=extracted["title"],
-                author=extracted["author"],
-                publish_date=extracted["publish_date"],
-                raw_content=extracted["content"],
-                processed=False,
-            )
-
-            with SessionLocal() as session:
-                session.add(content)
-                session.commit()
-                session.refresh(content)
+            inserted = insert_contents(session, [self._article_row(html, url, source_name)])
+            if not inserted:
+                logger.info("article_exists", url=url)
+                return None
 
+            content = inserted[0]
             logger.info("article_scraped", title=content.title, url=url)
             return content
 
@@ -112,13 +244,77 @@ class WebScraper:
             logger.error("scrape_failed", url=url, error=str(e))
             return None
 
-    def scrape_articles(self, urls: list[tuple[str, str]]) -> list[Content]:
-        collected = []
+    def _async_client(self) -> httpx.AsyncClient:
+        # An AsyncClient's pool belongs to the event loop it first ran on,
+        # so each batch opens its own rather than sharing one across asyncio.run calls
+        return httpx.AsyncClient(headers=self.headers, cookies=self.auth_cookies, **_CLIENT_OPTIONS)
+
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
+    async def afetch_page(self, client: httpx.AsyncClient, url: str) -> str:
+        response = await client.get(url)
+        response.raise_for_status()
+        return response.text
+
+    async def _scrape_one(
+        self, client: httpx.AsyncClient, sem: asyncio.Semaphore, url: str, source_name: str
+    ) -> Optional[dict[str, Any]]:
+        logger.info("scraping_article", url=url, source=source_name)
+        try:
+            async with sem:
+                html = await self.afetch_page(client, url)
+            return self._article_row(html, url, source_name)
+        except Exception as e:
+            logger.error("scrape_failed", url=url, error=str(e))
+            return None
+
+    async def ascrape_articles(self, urls: list[tuple[str, str]]) -> list[Content]:
+        # Duplicate URLs in one batch would collide on the unique source_url
+        sources: dict[str, str] = {}
         for url, source_name in urls:
-            content = self.scrape_article(url, source_name)
-            if content:
-                collected.append(content)
+            sources.setdefault(url, source_name)
+
+        with SessionLocal(expire_on_commit=False) as session:
+            # One existence query for the whole batch, before any fetching;
+            # ending the read transaction returns the connection to the pool
+            # while the fetches run
+            existing = self._existing(session, sources)
+            session.rollback()
+            pending = [
+                (url, source_name) for url, source_name in sources.items() if url not in existing
+            ]
+            if not pending:
+                return []
+
+            sem = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
+            async with self._async_client() as client:
+                results = await asyncio.gather(
+                    *(
+                        self._scrape_one(client, sem, url, source_name)
+                        for url, source_name in pending
+                    ),
+                    return_exceptions=True,
+                )
+
+            rows = [result for result in results if isinstance(result, dict)]
+            if not rows:
+                return []
+
+            # One transaction for the whole batch, after every fetch has finished
+            collected = insert_contents(session, rows)
+            session.commit()
+
+        for content in collected:
+            logger.info("article_scraped", title=content.title, url=content.source_url)
         return collected
 
-    def close(self):
+    def scrape_articles(self, urls: list[tuple[str, str]]) -> list[Content]:
+        return asyncio.run(self.ascrape_articles(urls))
+
+    def close(self) -> None:
         self.client.close()
+
+    def __enter__(self) -> "WebScraper":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
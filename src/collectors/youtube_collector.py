@@ -1,27 +1,46 @@
-import json
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Any, Optional
 
 import structlog
 
 try:
-    from googleapiclient.discovery import build
     from googleapiclient.errors import HttpError
 except ImportError:
-    build = None
     HttpError = Exception
 
 from src.config import settings
-from src.storage import Content, ContentType, SessionLocal
+from src.storage import (
+    MAX_RAW_CONTENT_CHARS,
+    Content,
+    ContentType,
+    SessionLocal,
+    existing_source_urls,
+    insert_contents,
+)
 
 logger = structlog.get_logger()
 
+# videos.list accepts at most 50 comma-separated IDs
+VIDEOS_PER_REQUEST = 50
+
+_DURATION_UNITS = {"H": 3600, "M": 60, "S": 1}
+
+
+def _watch_url(video_id: Optional[str]) -> str:
+    return f"https://www.youtube.com/watch?v={video_id}" if video_id else ""
+
 
 class YouTubeCollector:
-    def __init__(self):
+    def __init__(self) -> None:
         self.youtube = None
-        if build and settings.youtube_api_key:
-            self.youtube = build("youtube", "v3", developerKey=settings.youtube_api_key)
+        if not settings.youtube_api_key:
+            return
+        try:
+            # discovery drags in httplib2 and google-auth; only load it when configured
+            from googleapiclient.discovery import build
+        except ImportError:
+            return
+        self.youtube = build("youtube", "v3", developerKey=settings.youtube_api_key)
 
     def get_channel_uploads(self, channel_id: str, max_results: int = 10) -> list[dict]:
         if not self.youtube:
@@ -53,54 +72,65 @@ class YouTubeCollector:
             logger.error("youtube_api_error", error=str(e), channel_id=channel_id)
             return []
 
-    def get_video_details(self, video_id: str) -> Optional[dict]:
+    def get_videos_details(self, video_ids: list[str]) -> dict[str, dict[str, Any]]:
+        """Details keyed by video ID, fetched VIDEOS_PER_REQUEST IDs per videos.list call."""
+        details: dict[str, dict[str, Any]] = {}
         if not self.youtube:
-            return None
-
-        try:
-            response = self.youtube.videos().list(
-                part="snippet,contentDetails,statistics", id=video_id
-            ).execute()
+            return details
 
-            if response.get("items"):
-                return response["items"][0]
-            return None
+        for start in range(0, len(video_ids), VIDEOS_PER_REQUEST):
+            batch = video_ids[start:start + VIDEOS_PER_REQUEST]
+            try:
+                response = self.youtube.videos().list(
+                    part="contentDetails", id=",".join(batch)
+                ).execute()
+            except HttpError as e:
+                logger.error("video_details_error", error=str(e), video_ids=batch)
+                continue
+            details.update((item["id"], item) for item in response.get("items", []))
 
-        except HttpError as e:
-            logger.error("video_details_error", error=str(e), video_id=video_id)
-            return None
+        return details
 
     def parse_duration(self, duration_str: str) -> int:
-        import re
-        pattern = re.compile(r"PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?")
-        match = pattern.match(duration_str)
-        if not match:
+        # ISO-8601 "PT#H#M#S": one pass accumulating digits, flushed at each unit
+        if not duration_str.startswith("PT"):
             return 0
-        hours = int(match.group(1) or 0)
-        minutes = int(match.group(2) or 0)
-        seconds = int(match.group(3) or 0)
-        return hours * 3600 + minutes * 60 + seconds
+        total = number = 0
+        for char in duration_str[2:]:
+            unit = _DURATION_UNITS.get(char)
+            if unit is not None:
+                total += number * unit
+                number = 0
+            elif "0" <= char <= "9":
+                number = number * 10 + ord(char) - 48
+            else:
+                break
+        return total
 
     def collect_from_channel(self, channel_name: str, channel_id: str) -> list[Content]:
         logger.info("collecting_youtube", channel_name=channel_name, channel_id=channel_id)
-        collected = []
 
         videos = self.get_channel_uploads(channel_id)
 
         with SessionLocal() as session:
+            seen = existing_source_urls(
+                session,
+                (_watch_url(item.get("contentDetails", {}).get("videoId")) for item in videos),
+            )
+            new_videos = []
             for item in videos:
-                snippet = item.get("snippet", {})
                 video_id = item.get("contentDetails", {}).get("videoId")
-                if not video_id:
+                source_url = _watch_url(video_id)
+                if not video_id or source_url in seen:
                     continue
+                seen.add(source_url)
+                new_videos.append((item.get("snippet", {}), video_id, source_url))
 
-                source_url = f"https://www.youtube.com/watch?v={video_id}"
+            details = self.get_videos_details([video_id for _, video_id, _ in new_videos])
 
-                existing = session.query(Content).filter_by(source_url=source_url).first()
-                if existing:
-                    continue
-
-                video_details = self.get_video_details(video_id)
+            rows = []
+            for snippet, video_id, source_url in new_videos:
+                video_details = details.get(video_id)
                 duration_seconds = 0
                 if video_details:
                     duration_str = video_details.get("contentDetails", {}).get("duration", "")
@@ -112,27 +142,26 @@ class YouTubeCollector:
                 else:
                     publish_date = datetime.now(timezone.utc)
 
-                content = Content(
-                    source_name=channel_name,
-                    source_url=source_url,
-                    content_type=ContentType.VIDEO,
-                    title=snippet.get("title", "Untitled"),
-                    author=snippet.get("channelTitle"),
-                    publish_date=publish_date,
-                    raw_content=snippet.get("description", ""),
-                    duration_seconds=duration_seconds,
-                    entities=json.dumps({
+                rows.append({
+                    "source_name": channel_name,
+                    "source_url": source_url,
+                    "content_type": ContentType.VIDEO,
+                    "title": snippet.get("title", "Untitled"),
+                    "author": snippet.get("channelTitle"),
+                    "publish_date": publish_date,
+                    "raw_content": snippet.get("description", "")[:MAX_RAW_CONTENT_CHARS],
+                    "duration_seconds": duration_seconds,
+                    "entities": {
                         "video_id": video_id,
                         "channel_id": channel_id,
                         "thumbnail": snippet.get("thumbnails", {}).get("high", {}).get("url"),
-                    }),
-                    processed=False,
-                )
+                    },
+                    "processed": False,
+                })
 
-                session.add(content)
-                collected.append(content)
+            collected = insert_contents(session, rows)
+            for content in collected:
                 logger.info("video_collected", title=content.title, channel=channel_name)
-
             session.commit()
 
         return collected
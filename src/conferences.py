@@ -2,26 +2,27 @@ from datetime import datetime, timezone
 from typing import Optional
 
 import structlog
+from sqlalchemy import select
 
 from src.storage import Conference, SessionLocal
 
 logger = structlog.get_logger()
 
 # Default major AI/tech conferences
-DEFAULT_CONFERENCES = [
+DEFAULT_CONFERENCES = (
     # Q1
     {
         "name": "CES",
-        "start_date": "2025-01-07",
-        "end_date": "2025-01-10",
+        "start_date": datetime(2025, 1, 7, tzinfo=timezone.utc),
+        "end_date": datetime(2025, 1, 10, tzinfo=timezone.utc),
         "location": "Las Vegas, NV",
         "website": "https://www.ces.tech/",
         "quarter": "Q1 2025",
     },
     {
         "name": "SXSW",
-        "start_date": "2025-03-07",
-        "end_date": "2025-03-15",
+        "start_date": datetime(2025, 3, 7, tzinfo=timezone.utc),
+        "end_date": datetime(2025, 3, 15, tzinfo=timezone.utc),
         "location": "Austin, TX",
         "website": "https://www.sxsw.com/",
         "quarter": "Q1 2025",
@@ -29,16 +30,16 @@ DEFAULT_CONFERENCES = [
     # Q2
     {
         "name": "Google I/O",
-        "start_date": "2025-05-14",
-        "end_date": "2025-05-15",
+        "start_date": datetime(2025, 5, 14, tzinfo=timezone.utc),
+        "end_date": datetime(2025, 5, 15, tzinfo=timezone.utc),
         "location": "Mountain View, CA",
         "website": "https://io.google/",
         "quarter": "Q2 2025",
     },
     {
         "name": "Microsoft Build",
-        "start_date": "2025-05-19",
-        "end_date": "2025-05-21",
+        "start_date": datetime(2025, 5, 19, tzinfo=timezone.utc),
+        "end_date": datetime(2025, 5, 21, tzinfo=timezone.utc),
         "location": "Seattle, WA",
         "website": "https://build.microsoft.com/",
         "quarter": "Q2 2025",
@@ -46,16 +47,16 @@ DEFAULT_CONFERENCES = [
     # Q3
     {
         "name": "Dreamforce",
-        "start_date": "2025-09-16",
-        "end_date": "2025-09-18",
+        "start_date": datetime(2025, 9, 16, tzinfo=timezone.utc),
+        "end_date": datetime(2025, 9, 18, tzinfo=timezone.utc),
         "location": "San Francisco, CA",
         "website": "https://www.salesforce.com/dreamforce/",
         "quarter": "Q3 2025",
     },
     {
         "name": "TechCrunch Disrupt",
-        "start_date": "2025-09-29",
-        "end_date": "2025-10-01",
+        "start_date": datetime(2025, 9, 29, tzinfo=timezone.utc),
+        "end_date": datetime(2025, 10, 1, tzinfo=timezone.utc),
         "location": "San Francisco, CA",
         "website": "https://techcrunch.com/events/disrupt/",
         "quarter": "Q3 2025",
@@ -63,52 +64,38 @@ DEFAULT_CONFERENCES = [
     # Q4
     {
         "name": "AWS re:Invent",
-        "start_date": "2025-12-01",
-        "end_date": "2025-12-05",
+        "start_date": datetime(2025, 12, 1, tzinfo=timezone.utc),
+        "end_date": datetime(2025, 12, 5, tzinfo=timezone.utc),
         "location": "Las Vegas, NV",
         "website": "https://reinvent.awsevents.com/",
         "quarter": "Q4 2025",
     },
     {
         "name": "NeurIPS",
-        "start_date": "2025-12-08",
-        "end_date": "2025-12-14",
+        "start_date": datetime(2025, 12, 8, tzinfo=timezone.utc),
+        "end_date": datetime(2025, 12, 14, tzinfo=timezone.utc),
         "location": "Vancouver, BC",
         "website": "https://neurips.cc/",
         "quarter": "Q4 2025",
     },
-]
+)
 
 
 def seed_conferences():
     with SessionLocal() as session:
-        for conf_data in DEFAULT_CONFERENCES:
-            existing = (
-                session.query(Conference)
-                .filter_by(name=conf_data["name"], quarter=conf_data["quarter"])
-                .first()
-            )
-            if existing:
-                continue
-
-            conference = Conference(
-                name=conf_data["name"],
-                start_date=datetime.strptime(conf_data["start_date"], "%Y-%m-%d").replace(
-                    tzinfo=timezone.utc
-                ),
-                end_date=(
-                    datetime.strptime(conf_data["end_date"], "%Y-%m-%d").replace(
-                        tzinfo=timezone.utc
-                    )
-                    if conf_data.get("end_date")
-                    else None
-                ),
-                location=conf_data.get("location"),
-                website=conf_data.get("website"),
-                quarter=conf_data["quarter"],
-            )
-            session.add(conference)
-
+        # One lookup for every default; (name, quarter) identifies a conference
+        existing = set(
+            session.execute(
+                select(Conference.name, Conference.quarter).where(
+                    Conference.quarter.in_({conf["quarter"] for conf in DEFAULT_CONFERENCES})
+                )
+            ).tuples()
+        )
+        session.add_all(
+            Conference(**conf_data)
+            for conf_data in DEFAULT_CONFERENCES
+            if (conf_data["name"], conf_data["quarter"]) not in existing
+        )
         session.commit()
         logger.info("conferences_seeded")
 
@@ -21,6 +21,13 @@ class Settings(BaseSettings):
     # Processing settings
     claude_model: str = Field(default="claude-sonnet-4-20250514")
     max_summary_tokens: int = Field(default=500)
+    # Message Batches cost half as much but can take hours; off sends
+    # on-demand requests, up to anthropic_concurrency at a time
+    use_batch_api: bool = Field(default=True)
+    # A batch still running after this long is cancelled and its items sent
+    # on demand instead
+    batch_max_wait_minutes: int = Field(default=60)
+    anthropic_concurrency: int = Field(default=8)
 
     # Polling intervals (hours)
     rss_poll_interval: int = Field(default=6)
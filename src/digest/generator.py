@@ -1,96 +1,169 @@
 import json
+from collections.abc import Sequence
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Optional, Union
 
 import structlog
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+from sqlalchemy import select, update
+from sqlalchemy.engine import Row
 
-from src.storage import Category, Content, ContentType, Digest, SessionLocal, Conference
+from src.storage import Category, Conference, Content, ContentType, Digest, SessionLocal
+
+try:
+    from orjson import loads as _loads
+except ImportError:
+    _loads = json.loads  # type: ignore[assignment]
+
+if TYPE_CHECKING:
+    from typing_extensions import Unpack
+
+    # A Content, or a get_recent_content row with the same attribute names
+    _DigestItem = Union[Content, Row[Unpack[tuple[Any, ...]]]]
 
 logger = structlog.get_logger()
 
 
-def _parse_json(value: Optional[str], default=None):
-    """Parse JSON string, return default if None or invalid."""
+# Category sections in precedence order: an item lands in the first one
+# any of its categories maps to. Category members hash like their string
+# values, so the raw JSON strings look up directly.
+_SECTIONS = ("investment_signals", "market_intelligence", "technical")
+_CATEGORY_RANK: dict[str, int] = {
+    Category.FUNDING: 0,
+    Category.PRODUCT_LAUNCH: 0,
+    Category.MA: 0,
+    Category.TREND: 1,
+    Category.REGULATORY: 1,
+    Category.TALENT: 1,
+    Category.TECHNICAL: 2,
+}
+_NO_SECTION = len(_SECTIONS)
+
+
+def _parse_json(value: Any, default: Any = None) -> Any:
+    """Parse JSON string, return default if None or invalid.
+
+    JSON columns load as lists/dicts already; those pass through.
+    """
     if not value:
         return default if default is not None else {}
+    if isinstance(value, (dict, list)):
+        return value
     try:
-        return json.loads(value)
+        return _loads(value)
     except (json.JSONDecodeError, TypeError):
         return default if default is not None else {}
 
 
+def parsed_categories(item: "_DigestItem") -> list[str]:
+    """item.categories as a list, [] when unset."""
+    categories: list[str] = _parse_json(item.categories, [])
+    return categories
+
+
+def relevance_of(item: "_DigestItem") -> int:
+    """The stored relevance_score column."""
+    return item.relevance_score
+
+
 class DigestGenerator:
     def __init__(self):
         template_dir = Path(__file__).parent.parent.parent / "templates"
         self.env = Environment(
             loader=FileSystemLoader(template_dir),
             autoescape=select_autoescape(["html", "xml"]),
+            # Compiled templates persist across runs (per-user temp dir);
+            # templates only change with a deploy, so skip per-render stat checks
+            bytecode_cache=FileSystemBytecodeCache(),
+            auto_reload=False,
         )
+        self.template = self.env.get_template("digest_email.html")
 
-    def get_recent_content(self, hours: int = 24) -> list[Content]:
+    def get_recent_content(self, hours: int = 24) -> Sequence["_DigestItem"]:
+        """Recent processed content as plain rows with Content's attribute names.
+
+        The digest only reads, so rows skip ORM instance construction and
+        identity-map bookkeeping.
+        """
         cutoff = datetime.now(timezone.utc) - timedelta(hours=hours)
-        with SessionLocal() as session:
-            content = (
-                session.query(Content)
-                .filter(Content.publish_date >= cutoff)
-                .filter(Content.processed == True)
-                .order_by(Content.publish_date.desc())
-                .all()
+        stmt = (
+            select(
+                # Everything the digest sections and template read; skips
+                # raw_content, transcript and entities, which can be large
+                Content.id,
+                Content.source_name,
+                Content.source_url,
+                Content.content_type,
+                Content.title,
+                Content.author,
+                Content.publish_date,
+                Content.summary,
+                Content.categories,
+                Content.investment_signals,
+                Content.relevance_score,
+                Content.duration_seconds,
             )
-            # Detach from session
-            session.expunge_all()
-            return content
-
-    def get_top_signal(self, content_list: list[Content]) -> Optional[Content]:
-        scored = []
-        for item in content_list:
-            signals = _parse_json(item.investment_signals)
-            score = signals.get("relevance_score", 0)
-            if score >= 7:  # Only consider high-relevance items
-                scored.append((score, item))
-        
-        if scored:
-            scored.sort(key=lambda x: x[0], reverse=True)
-            return scored[0][1]
-        return None
+            .where(Content.publish_date >= cutoff, Content.processed.is_(True))
+            .order_by(Content.publish_date.desc())
+        )
+        with SessionLocal() as session:
+            return session.execute(stmt).all()
 
-    def categorize_content(self, content_list: list[Content]) -> dict:
-        categorized = {
+    def scan_content(
+        self, content_list: Sequence["_DigestItem"]
+    ) -> tuple[Optional["_DigestItem"], dict[str, list["_DigestItem"]], dict[ContentType, int]]:
+        """Top signal, digest sections and type counts from a single pass."""
+        top_signal: Optional[_DigestItem] = None
+        top_score = 0
+        categorized: dict[str, list[_DigestItem]] = {
             "investment_signals": [],
             "market_intelligence": [],
             "technical": [],
             "deep_dives": [],
         }
-
-        investment_categories = {Category.FUNDING, Category.PRODUCT_LAUNCH, Category.MA}
-        market_categories = {Category.TREND, Category.REGULATORY, Category.TALENT}
-        technical_categories = {Category.TECHNICAL}
+        counts = {ContentType.ARTICLE: 0, ContentType.PODCAST: 0, ContentType.VIDEO: 0}
 
         for item in content_list:
-            categories = set(_parse_json(item.categories, []))
-            signals = _parse_json(item.investment_signals)
-            relevance = signals.get("relevance_score", 0)
+            categories = parsed_categories(item)
+            relevance = relevance_of(item)
+
+            # Only consider high-relevance items; ties keep the earliest
+            if relevance >= 7 and (top_signal is None or relevance > top_score):
+                top_signal, top_score = item, relevance
 
-            if categories & investment_categories or relevance >= 8:
-                categorized["investment_signals"].append(item)
-            elif categories & market_categories:
-                categorized["market_intelligence"].append(item)
-            elif categories & technical_categories:
-                categorized["technical"].append(item)
+            if relevance >= 8:
+                rank = 0
+            else:
+                rank = min(
+                    (_CATEGORY_RANK.get(category, _NO_SECTION) for category in categories),
+                    default=_NO_SECTION,
+                )
+            if rank < _NO_SECTION:
+                categorized[_SECTIONS[rank]].append(item)
 
             # Deep dives: longer content with high relevance
             if item.content_type in [ContentType.PODCAST, ContentType.VIDEO] and relevance >= 6:
                 categorized["deep_dives"].append(item)
 
+            if item.content_type in counts:
+                counts[item.content_type] += 1
+
         # Limit sections
         categorized["investment_signals"] = categorized["investment_signals"][:10]
         categorized["market_intelligence"] = categorized["market_intelligence"][:8]
         categorized["technical"] = categorized["technical"][:5]
         categorized["deep_dives"] = categorized["deep_dives"][:3]
 
-        return categorized
+        return top_signal, categorized, counts
+
+    def get_top_signal(self, content_list: Sequence["_DigestItem"]) -> Optional["_DigestItem"]:
+        return self.scan_content(content_list)[0]
+
+    def categorize_content(
+        self, content_list: Sequence["_DigestItem"]
+    ) -> dict[str, list["_DigestItem"]]:
+        return self.scan_content(content_list)[1]
 
     def get_upcoming_conferences(self) -> list[Conference]:
         now = datetime.now(timezone.utc)
@@ -123,21 +196,15 @@ class DigestGenerator:
             date = datetime.now(timezone.utc)
 
         content_list = self.get_recent_content(hours=24)
-        
-        article_count = sum(1 for c in content_list if c.content_type == ContentType.ARTICLE)
-        podcast_count = sum(1 for c in content_list if c.content_type == ContentType.PODCAST)
-        video_count = sum(1 for c in content_list if c.content_type == ContentType.VIDEO)
-
-        top_signal = self.get_top_signal(content_list)
-        categorized = self.categorize_content(content_list)
+        top_signal, categorized, counts = self.scan_content(content_list)
         conferences = self.get_upcoming_conferences()
 
         return {
             "date": date,
             "counts": {
-                "articles": article_count,
-                "podcasts": podcast_count,
-                "videos": video_count,
+                "articles": counts[ContentType.ARTICLE],
+                "podcasts": counts[ContentType.PODCAST],
+                "videos": counts[ContentType.VIDEO],
                 "total": len(content_list),
             },
             "top_signal": top_signal,
@@ -146,8 +213,7 @@ class DigestGenerator:
         }
 
     def render_html(self, digest_data: dict) -> str:
-        template = self.env.get_template("digest_email.html")
-        return template.render(
+        return self.template.render(
             digest=digest_data,
             format_duration=self.format_duration,
         )
@@ -161,13 +227,13 @@ class DigestGenerator:
         with SessionLocal() as session:
             digest = Digest(
                 date=digest_data["date"],
-                content_ids=json.dumps(content_ids),
+                content_ids=content_ids,
                 top_signal=(
-                    json.dumps({
+                    {
                         "id": digest_data["top_signal"].id,
                         "title": digest_data["top_signal"].title,
                         "summary": digest_data["top_signal"].summary,
-                    })
+                    }
                     if digest_data["top_signal"]
                     else None
                 ),
@@ -175,15 +241,16 @@ class DigestGenerator:
                 sent=False,
             )
             session.add(digest)
-            session.commit()
-            session.refresh(digest)
 
-            # Mark content as included
-            for content_id in content_ids:
-                content = session.query(Content).filter_by(id=int(content_id)).first()
-                if content:
-                    content.included_in_digest = True
+            # Mark content as included, in the same transaction as the digest
+            if content_ids:
+                session.execute(
+                    update(Content)
+                    .where(Content.id.in_({int(content_id) for content_id in content_ids}))
+                    .values(included_in_digest=True)
+                )
             session.commit()
+            session.refresh(digest)
 
             logger.info("digest_created", digest_id=digest.id, items=len(content_ids))
             return digest
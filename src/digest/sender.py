@@ -1,6 +1,7 @@
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Any, Optional
 
+import httpx
 import structlog
 
 from src.config import settings
@@ -8,21 +9,33 @@ from src.storage import Digest, SessionLocal
 
 logger = structlog.get_logger()
 
+# The body is mostly the digest HTML; orjson encodes it straight to bytes
 try:
-    from sendgrid import SendGridAPIClient
-    from sendgrid.helpers.mail import Mail, Email, To, Content as SGContent
+    import orjson
+
+    _dumps = orjson.dumps
 except ImportError:
-    SendGridAPIClient = None
+    import json
+
+    def _dumps(data: Any) -> bytes:  # type: ignore[misc]
+        return json.dumps(data).encode()
+
+SENDGRID_SEND_URL = "https://api.sendgrid.com/v3/mail/send"
 
 
 class EmailSender:
     def __init__(self):
-        self.sg_client = None
-        if SendGridAPIClient and settings.sendgrid_api_key:
-            self.sg_client = SendGridAPIClient(settings.sendgrid_api_key)
+        # Posts to SendGrid's v3 REST API directly; one pooled client
+        # serves every send from a long-lived sender (the scheduler's)
+        self.client = None
+        if settings.sendgrid_api_key:
+            self.client = httpx.Client(
+                timeout=30.0,
+                headers={"Authorization": f"Bearer {settings.sendgrid_api_key}"},
+            )
 
     def send_digest(self, digest: Digest, to_email: Optional[str] = None) -> bool:
-        if not self.sg_client:
+        if not self.client:
             logger.error("sendgrid_not_configured")
             return False
 
@@ -34,15 +47,19 @@ class EmailSender:
         date_str = digest.date.strftime("%B %d, %Y")
         subject = f"AI News Digest - {date_str}"
 
-        message = Mail(
-            from_email=Email(settings.from_email),
-            to_emails=To(recipient),
-            subject=subject,
-            html_content=SGContent("text/html", digest.html_content),
-        )
+        message = {
+            "personalizations": [{"to": [{"email": recipient}]}],
+            "from": {"email": settings.from_email},
+            "subject": subject,
+            "content": [{"type": "text/html", "value": digest.html_content}],
+        }
 
         try:
-            response = self.sg_client.send(message)
+            response = self.client.post(
+                SENDGRID_SEND_URL,
+                content=_dumps(message),
+                headers={"Content-Type": "application/json"},
+            )
             
             if response.status_code in [200, 201, 202]:
                 with SessionLocal() as session:
@@ -63,7 +80,7 @@ class EmailSender:
                 logger.error(
                     "send_failed",
                     status=response.status_code,
-                    body=response.body,
+                    body=response.text,
                 )
                 return False
 
@@ -85,3 +102,7 @@ class EmailSender:
                 return False
 
             return self.send_digest(digest, to_email)
+
+    def close(self) -> None:
+        if self.client:
+            self.client.close()
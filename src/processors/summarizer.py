@@ -1,18 +1,37 @@
+import asyncio
+import functools
 import json
-from typing import Optional
+import re
+import time
+from typing import Any, Optional
 
 import structlog
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import load_only
+
+from src.config import settings
+from src.processors import summary_cache
+from src.storage import (
+    MAX_RAW_CONTENT_CHARS,
+    Content,
+    ContentType,
+    SessionLocal,
+    signal_relevance,
+    table_of,
+)
 
 try:
-    import anthropic
+    from orjson import loads as _loads
 except ImportError:
-    anthropic = None
-
-from src.config import settings
-from src.storage import Category, Content, ContentType, SessionLocal
+    _loads = json.loads  # type: ignore[assignment]
 
 logger = structlog.get_logger()
 
+BATCH_POLL_SECONDS = 30
+
+# The characters that matter for finding where a JSON object ends
+_JSON_TOKENS = re.compile(r'[{}"\\]')
+
 ARTICLE_PROMPT = """Analyze this article about enterprise AI/tech and provide:
 
 1. SUMMARY: A 3-5 sentence executive summary focused on what matters for enterprise AI investment.
@@ -110,74 +129,280 @@ Respond in JSON format:
 }}"""
 
 
+def _extract_json(text: str) -> Optional[str]:
+    """The first balanced {...} in ``text``, ignoring braces inside JSON strings."""
+    depth = 0
+    start = -1
+    in_string = False
+    escaped_at = -1
+    for match in _JSON_TOKENS.finditer(text):
+        pos = match.start()
+        if pos == escaped_at:
+            continue
+        char = text[pos]
+        if in_string:
+            if char == "\\":
+                escaped_at = pos + 1
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            # Quotes in prose around the object don't open strings
+            in_string = depth > 0
+        elif char == "{":
+            if depth == 0:
+                start = pos
+            depth += 1
+        elif char == "}" and depth:
+            depth -= 1
+            if depth == 0:
+                return text[start:pos + 1]
+    return None
+
+
+def _split_prompt(template: str) -> tuple[str, str, str]:
+    # (instructions, "Title/Source/..." header, JSON skeleton), cut around the
+    # header fields and {content} once at import: only the short header is
+    # formatted per item, and the source text is joined in without a rescan
+    head, outro = template.split("{content}")
+    header_start = head.rindex("\n\n", 0, head.index("{title}")) + 2
+    return head[:header_start], head[header_start:], outro.format()
+
+
+_PROMPTS = {
+    ContentType.ARTICLE: _split_prompt(ARTICLE_PROMPT),
+    ContentType.PODCAST: _split_prompt(PODCAST_PROMPT),
+    ContentType.VIDEO: _split_prompt(VIDEO_PROMPT),
+}
+
+
 class ContentSummarizer:
-    def __init__(self):
-        self.client = None
-        if anthropic and settings.anthropic_api_key:
-            self.client = anthropic.Anthropic(api_key=settings.anthropic_api_key)
+    @functools.cached_property
+    def client(self) -> Any:
+        """Anthropic client, created on first use; None without a key or the SDK."""
+        if not settings.anthropic_api_key:
+            return None
+        try:
+            # The SDK is a sizeable import; only load it once something is summarized
+            import anthropic
+        except ImportError:
+            return None
+        return anthropic.Anthropic(api_key=settings.anthropic_api_key)
 
-    def _get_prompt(self, content: Content) -> str:
+    def _source_text(self, content: Content) -> str:
         text = content.transcript or content.raw_content or ""
-        text = text[:30000]  # Limit for context window
+        return text[:MAX_RAW_CONTENT_CHARS]  # Limit for context window
 
-        duration_mins = (content.duration_seconds or 0) // 60
+    def _cache_key(self, content: Content) -> Optional[str]:
+        return summary_cache.cache_key(content.content_type, self._source_text(content))
 
-        if content.content_type == ContentType.ARTICLE:
-            return ARTICLE_PROMPT.format(
-                title=content.title,
-                source=content.source_name,
-                content=text,
-            )
-        elif content.content_type == ContentType.PODCAST:
-            return PODCAST_PROMPT.format(
-                title=content.title,
-                source=content.source_name,
-                duration=duration_mins,
-                content=text,
-            )
-        else:  # VIDEO
-            return VIDEO_PROMPT.format(
-                title=content.title,
-                source=content.source_name,
-                duration=duration_mins,
-                content=text,
-            )
+    def _get_prompt(self, content: Content) -> str:
+        intro, header, outro = _PROMPTS.get(content.content_type, _PROMPTS[ContentType.VIDEO])
+        fields = header.format(
+            title=content.title,
+            source=content.source_name,
+            duration=(content.duration_seconds or 0) // 60,
+        )
+        return "".join((intro, fields, self._source_text(content), outro))
+
+    def _parse_result(self, result_text: str) -> Optional[dict[str, Any]]:
+        # Parse JSON from response
+        try:
+            result: dict[str, Any] = _loads(result_text)
+        except ValueError:
+            # Try to extract JSON from response
+            extracted = _extract_json(result_text)
+            if not extracted:
+                logger.error("json_parse_failed", response=result_text[:500])
+                return None
+            result = _loads(extracted)
+        return result
+
+    def _message_params(self, content: Content) -> dict[str, Any]:
+        return {
+            "model": settings.claude_model,
+            "max_tokens": settings.max_summary_tokens,
+            "messages": [{"role": "user", "content": self._get_prompt(content)}],
+        }
 
     def summarize(self, content: Content) -> Optional[dict]:
+        key = self._cache_key(content)
+        cached = summary_cache.get_cached([key] if key else [])
+        if key in cached:
+            logger.info("summary_cache_hit", content_id=content.id)
+            return cached[key]
+
         if not self.client:
             logger.error("anthropic_not_configured")
             return None
 
-        prompt = self._get_prompt(content)
+        try:
+            response = self.client.messages.create(**self._message_params(content))
+            result = self._parse_result(response.content[0].text)
 
+        except Exception as e:
+            logger.error("summarization_failed", content_id=content.id, error=str(e))
+            return None
+
+        if result and key:
+            summary_cache.store({key: result})
+        return result
+
+    def _message_batch(self, contents: list[Content]) -> Optional[dict[int, dict[str, Any]]]:
+        # Billed at half the on-demand rate; blocks, polling every
+        # BATCH_POLL_SECONDS, until the batch has ended. None, so the caller
+        # falls back to per-item requests, if it hasn't within
+        # settings.batch_max_wait_minutes or the Batches API call fails
+        results: dict[int, dict[str, Any]] = {}
         try:
-            response = self.client.messages.create(
-                model=settings.claude_model,
-                max_tokens=settings.max_summary_tokens,
-                messages=[{"role": "user", "content": prompt}],
+            batch = self.client.messages.batches.create(
+                requests=[
+                    {"custom_id": str(content.id), "params": self._message_params(content)}
+                    for content in contents
+                ]
             )
-
-            result_text = response.content[0].text
-
-            # Parse JSON from response
-            try:
-                result = json.loads(result_text)
-            except json.JSONDecodeError:
-                # Try to extract JSON from response
-                import re
-                json_match = re.search(r"\{.*\}", result_text, re.DOTALL)
-                if json_match:
-                    result = json.loads(json_match.group())
-                else:
-                    logger.error("json_parse_failed", response=result_text[:500])
+            logger.info("summary_batch_submitted", batch_id=batch.id, requests=len(contents))
+
+            deadline = time.monotonic() + settings.batch_max_wait_minutes * 60
+            while batch.processing_status != "ended":
+                if time.monotonic() >= deadline:
+                    logger.warning("summary_batch_timed_out", batch_id=batch.id)
+                    # So the fallback requests aren't billed a second time
+                    self.client.messages.batches.cancel(batch.id)
                     return None
+                time.sleep(BATCH_POLL_SECONDS)
+                batch = self.client.messages.batches.retrieve(batch.id)
+
+            for entry in self.client.messages.batches.results(batch.id):
+                content_id = int(entry.custom_id)
+                if entry.result.type != "succeeded":
+                    logger.error(
+                        "summarization_failed", content_id=content_id, error=entry.result.type
+                    )
+                    continue
+                try:
+                    result = self._parse_result(entry.result.message.content[0].text)
+                except ValueError as e:
+                    logger.error("summarization_failed", content_id=content_id, error=str(e))
+                    continue
+                if result:
+                    results[content_id] = result
+
+        except Exception as e:
+            logger.error("summary_batch_failed", error=str(e))
+            return None
 
-            return result
+        return results
+
+    async def _asummarize(
+        self, client: Any, sem: asyncio.Semaphore, content: Content
+    ) -> Optional[dict[str, Any]]:
+        try:
+            async with sem:
+                response = await client.messages.create(**self._message_params(content))
+            return self._parse_result(response.content[0].text)
 
         except Exception as e:
             logger.error("summarization_failed", content_id=content.id, error=str(e))
             return None
 
+    async def _concurrent_requests(self, contents: list[Content]) -> dict[int, dict[str, Any]]:
+        # An AsyncAnthropic client's connection pool belongs to the event loop
+        # it first ran on, so each run opens its own
+        from anthropic import AsyncAnthropic
+
+        sem = asyncio.Semaphore(settings.anthropic_concurrency)
+        async with AsyncAnthropic(api_key=settings.anthropic_api_key) as client:
+            results = await asyncio.gather(
+                *(self._asummarize(client, sem, content) for content in contents)
+            )
+        return {content.id: result for content, result in zip(contents, results) if result}
+
+    def summarize_batch(self, contents: list[Content]) -> dict[int, dict[str, Any]]:
+        """Summaries keyed by content ID, with one request per distinct uncached text.
+
+        Cached texts are answered without a request, and items sharing a text
+        share one. The requests go out as a single Message Batch, or with
+        ``settings.use_batch_api`` off (or the batch not done within
+        ``settings.batch_max_wait_minutes``), on demand with up to
+        ``settings.anthropic_concurrency`` in flight.
+        """
+        keys = {content.id: self._cache_key(content) for content in contents}
+        cached = summary_cache.get_cached(key for key in keys.values() if key)
+
+        results: dict[int, dict[str, Any]] = {}
+        # Requested content ID -> every content ID that shares its text
+        groups: dict[int, list[int]] = {}
+        by_key: dict[str, list[int]] = {}
+        pending = []
+        for content in contents:
+            key = keys[content.id]
+            if key in cached:
+                results[content.id] = cached[key]
+            elif key in by_key:
+                by_key[key].append(content.id)
+            else:
+                groups[content.id] = [content.id]
+                if key:
+                    by_key[key] = groups[content.id]
+                pending.append(content)
+
+        if results:
+            logger.info("summary_cache_hit", count=len(results))
+        if not pending:
+            return results
+        if not self.client:
+            logger.error("anthropic_not_configured")
+            return results
+
+        requested = self._message_batch(pending) if settings.use_batch_api else None
+        if requested is None:
+            requested = asyncio.run(self._concurrent_requests(pending))
+
+        fresh: dict[str, dict[str, Any]] = {}
+        for content_id, result in requested.items():
+            for shared_id in groups[content_id]:
+                results[shared_id] = result
+            key = keys[content_id]
+            if key:
+                fresh[key] = result
+        summary_cache.store(fresh)
+        return results
+
+    def _result_values(self, content: Content, result: dict[str, Any]) -> dict[str, Any]:
+        # Handle summary (can be string or list)
+        summary = result.get("summary", "")
+        if isinstance(summary, list):
+            summary = "\n".join(f"• {item}" for item in summary)
+
+        # Merge into what the collector stored (audio_url, video_id, ...)
+        entities = {**(content.entities or {}), **result.get("entities", {})}
+        if result.get("key_timestamps"):
+            entities["key_timestamps"] = result["key_timestamps"]
+        if result.get("content_type"):
+            entities["video_type"] = result["content_type"]
+
+        categories = result.get("categories", [])
+        signals = result.get("investment_signals", {})
+        return {
+            "content_id": content.id,
+            "summary": summary,
+            "categories": categories,
+            "entities": entities,
+            "investment_signals": signals,
+            "relevance_score": signal_relevance(signals),
+            "processed": True,
+        }
+
+    def _persist_results(self, rows: list[dict[str, Any]]) -> int:
+        # One executemany UPDATE for every summarized item, no per-row SELECT
+        table = table_of(Content)
+        with SessionLocal() as session:
+            updated = session.connection().execute(
+                update(table).where(table.c.id == bindparam("content_id")), rows
+            ).rowcount
+            session.commit()
+        return updated
+
     def process_content(self, content: Content) -> bool:
         logger.info("processing_content", content_id=content.id, title=content.title)
 
@@ -185,35 +410,8 @@ class ContentSummarizer:
         if not result:
             return False
 
-        with SessionLocal() as session:
-            db_content = session.query(Content).filter_by(id=content.id).first()
-            if not db_content:
-                return False
-
-            # Handle summary (can be string or list)
-            summary = result.get("summary", "")
-            if isinstance(summary, list):
-                summary = "\n".join(f"• {item}" for item in summary)
-            db_content.summary = summary
-
-            # Extract categories (store as JSON string)
-            categories = result.get("categories", [])
-            db_content.categories = json.dumps(categories)
-
-            # Store entities (as JSON string)
-            existing_entities = json.loads(db_content.entities) if db_content.entities else {}
-            existing_entities.update(result.get("entities", {}))
-            if result.get("key_timestamps"):
-                existing_entities["key_timestamps"] = result["key_timestamps"]
-            if result.get("content_type"):
-                existing_entities["video_type"] = result["content_type"]
-            db_content.entities = json.dumps(existing_entities)
-
-            # Store investment signals (as JSON string)
-            db_content.investment_signals = json.dumps(result.get("investment_signals", {}))
-
-            db_content.processed = True
-            session.commit()
+        if not self._persist_results([self._result_values(content, result)]):
+            return False
 
         logger.info("content_processed", content_id=content.id)
         return True
@@ -222,16 +420,37 @@ class ContentSummarizer:
         with SessionLocal() as session:
             unprocessed = (
                 session.query(Content)
+                # Just what prompts, cache keys and the entities merge read
+                .options(
+                    load_only(
+                        Content.id,
+                        Content.content_type,
+                        Content.title,
+                        Content.source_name,
+                        Content.duration_seconds,
+                        Content.transcript,
+                        Content.raw_content,
+                        Content.entities,
+                    )
+                )
                 .filter_by(processed=False)
                 .order_by(Content.publish_date.desc())
                 .limit(limit)
                 .all()
             )
 
-        processed_count = 0
-        for content in unprocessed:
-            if self.process_content(content):
-                processed_count += 1
-
-        logger.info("batch_processing_complete", processed=processed_count, total=len(unprocessed))
-        return processed_count
+        # One batch job for the page instead of a request per item
+        results = self.summarize_batch(unprocessed)
+
+        rows = [
+            self._result_values(content, results[content.id])
+            for content in unprocessed
+            if content.id in results
+        ]
+        if rows:
+            self._persist_results(rows)
+            for row in rows:
+                logger.info("content_processed", content_id=row["content_id"])
+
+        logger.info("batch_processing_complete", processed=len(rows), total=len(unprocessed))
+        return len(rows)
@@ -0,0 +1,48 @@
+"""Claude results stored by source text, so reposts reuse the first summary."""
+
+import hashlib
+from collections.abc import Iterable
+from typing import Any, Optional
+
+from sqlalchemy import select
+
+from src.config import settings
+from src.storage import ContentType, SessionLocal, SummaryCache, insert_ignore
+
+
+def cache_key(content_type: str, text: str) -> Optional[str]:
+    """Key for one piece of source text, or None when there is none to summarize.
+
+    Whitespace and case are normalized so syndicated copies of a story
+    share a key; the model name is part of it, so switching
+    ``settings.claude_model`` starts from an empty cache.
+    """
+    normalized = " ".join(text.split()).casefold()
+    if not normalized:
+        return None
+    parts = (settings.claude_model, ContentType(content_type).value, normalized)
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+
+def get_cached(keys: Iterable[str]) -> dict[str, dict[str, Any]]:
+    """Stored results for whichever of ``keys`` have one, in one IN query."""
+    wanted = set(keys)
+    if not wanted:
+        return {}
+    with SessionLocal() as session:
+        rows = session.execute(
+            select(SummaryCache.key, SummaryCache.result).where(SummaryCache.key.in_(wanted))
+        )
+        return dict(rows.all())
+
+
+def store(results: dict[str, dict[str, Any]]) -> None:
+    if not results:
+        return
+    with SessionLocal() as session:
+        # Another run may have cached the same text in the meantime
+        session.execute(
+            insert_ignore(session, SummaryCache),
+            [{"key": key, "result": result} for key, result in results.items()],
+        )
+        session.commit()
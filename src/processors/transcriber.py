@@ -1,33 +1,82 @@
+import functools
+import shutil
+import subprocess
 import tempfile
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional, Union
 
 import httpx
 import structlog
 
 logger = structlog.get_logger()
 
+# Both Whisper backends take 16 kHz mono float32 samples directly
+SAMPLE_RATE = 16000
+_DOWNLOAD_CHUNK = 64 * 1024
+# VAD-split chunks of one recording decoded per GPU forward pass
+TRANSCRIBE_BATCH_SIZE = 16
+# The decode whisper.load_audio runs, reading stdin instead of a file
+_FFMPEG_DECODE = (
+    "ffmpeg", "-nostdin", "-threads", "0", "-i", "pipe:0",
+    "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE), "pipe:1",
+)
+
 try:
-    import whisper
+    import numpy as np
 except ImportError:
-    whisper = None
+    np = None
 
 
 class AudioTranscriber:
     def __init__(self, model_size: str = "base"):
-        self.model = None
         self.model_size = model_size
-        self._load_model()
+        # True when self.model is a faster-whisper (CTranslate2) model
+        self.faster = False
+        # faster-whisper's batched decoder, on GPU only
+        self.pipeline = None
+
+    @functools.cached_property
+    def model(self) -> Any:
+        """The Whisper model, loaded on first use rather than at construction."""
+        return self._load_model()
+
+    def _load_model(self) -> Any:
+        # Imported here too: either backend pulls in a large native runtime
+        try:
+            import ctranslate2
+            import faster_whisper
+        except ImportError:
+            faster_whisper = None
+        try:
+            import whisper
+        except ImportError:
+            whisper = None
 
-    def _load_model(self):
-        if not whisper:
+        if faster_whisper is None and whisper is None:
             logger.warning("whisper_not_installed")
-            return
+            return None
         try:
-            self.model = whisper.load_model(self.model_size)
-            logger.info("whisper_model_loaded", model_size=self.model_size)
+            if faster_whisper is not None:
+                # int8 weights; float16 activations where there is a GPU
+                if ctranslate2.get_cuda_device_count():
+                    device, compute_type = "cuda", "int8_float16"
+                else:
+                    device, compute_type = "cpu", "int8"
+                model = faster_whisper.WhisperModel(
+                    self.model_size, device=device, compute_type=compute_type
+                )
+                self.faster = True
+                if device == "cuda":
+                    self.pipeline = faster_whisper.BatchedInferencePipeline(model=model)
+            else:
+                device = None
+                model = whisper.load_model(self.model_size)
+            logger.info("whisper_model_loaded", model_size=self.model_size, device=device)
+            return model
         except Exception as e:
             logger.error("whisper_load_failed", error=str(e))
+            return None
 
     def download_audio(self, url: str, output_path: Path) -> bool:
         try:
@@ -42,14 +91,76 @@ class AudioTranscriber:
             logger.error("audio_download_failed", url=url, error=str(e))
             return False
 
-    def transcribe_file(self, audio_path: Path) -> Optional[dict]:
+    def stream_audio(self, url: str) -> Optional["np.ndarray"]:
+        """Download ``url`` straight into ffmpeg and return its decoded samples."""
+        process = subprocess.Popen(
+            _FFMPEG_DECODE,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        stdin, stdout = process.stdin, process.stdout
+        assert stdin is not None and stdout is not None  # both are PIPEs
+        # Drain stdout alongside the download so neither pipe fills up and blocks
+        pcm: list[bytes] = []
+        reader = threading.Thread(target=lambda: pcm.append(stdout.read()))
+        reader.start()
+        try:
+            with httpx.stream("GET", url, timeout=300.0, follow_redirects=True) as response:
+                response.raise_for_status()
+                for chunk in response.iter_bytes(chunk_size=_DOWNLOAD_CHUNK):
+                    stdin.write(chunk)
+        except BrokenPipeError:
+            pass  # ffmpeg exited early; its return code is checked below
+        except Exception as e:
+            logger.error("audio_download_failed", url=url, error=str(e))
+            process.kill()
+            return None
+        finally:
+            try:
+                stdin.close()
+            except BrokenPipeError:
+                pass
+            reader.join()
+            process.wait()
+
+        if process.returncode:
+            logger.error("audio_decode_failed", url=url, returncode=process.returncode)
+            return None
+        logger.info("audio_downloaded", url=url)
+        return np.frombuffer(pcm[0], np.int16).astype(np.float32) / 32768.0
+
+    def transcribe_file(self, audio_path: Path) -> Optional[dict[str, Any]]:
+        return self._transcribe(str(audio_path), str(audio_path))
+
+    def _transcribe(self, audio: Union[str, "np.ndarray"], source: str) -> Optional[dict[str, Any]]:
         if not self.model:
             logger.error("no_whisper_model")
             return None
 
         try:
+            if self.faster:
+                if self.pipeline is not None:
+                    # Splits on silence itself (VAD), greedy decoding (beam_size=1)
+                    segments, _ = self.pipeline.transcribe(
+                        audio, language="en", beam_size=1, batch_size=TRANSCRIBE_BATCH_SIZE
+                    )
+                else:
+                    # vad_filter skips silence; greedy decoding (beam_size=1)
+                    segments, _ = self.model.transcribe(
+                        audio, language="en", vad_filter=True, beam_size=1
+                    )
+                segments = list(segments)  # decoding happens as this is consumed
+                return {
+                    "text": "".join(seg.text for seg in segments),
+                    "segments": [
+                        {"start": seg.start, "end": seg.end, "text": seg.text}
+                        for seg in segments
+                    ],
+                }
+
             result = self.model.transcribe(
-                str(audio_path),
+                audio,
                 language="en",
                 verbose=False,
             )
@@ -65,17 +176,29 @@ class AudioTranscriber:
                 ],
             }
         except Exception as e:
-            logger.error("transcription_failed", path=str(audio_path), error=str(e))
+            logger.error("transcription_failed", path=source, error=str(e))
+            return None
+
+    def transcribe_url(self, audio_url: str) -> Optional[dict[str, Any]]:
+        if not self.model:
+            logger.error("no_whisper_model")
             return None
 
-    def transcribe_url(self, audio_url: str) -> Optional[dict]:
+        if np is not None and shutil.which("ffmpeg"):
+            # No temp file: the download is decoded as it arrives
+            audio = self.stream_audio(audio_url)
+            if audio is not None:
+                return self._transcribe(audio, audio_url)
+            # Containers ffmpeg can't decode from a pipe (MP4/M4A with the moov
+            # atom at the end) still decode from a seekable file
+
         with tempfile.TemporaryDirectory() as tmpdir:
             audio_path = Path(tmpdir) / "audio.mp3"
             if not self.download_audio(audio_url, audio_path):
                 return None
             return self.transcribe_file(audio_path)
 
-    def transcribe_youtube(self, video_id: str) -> Optional[dict]:
+    def transcribe_youtube(self, video_id: str) -> Optional[dict[str, Any]]:
         try:
             import yt_dlp
         except ImportError:
@@ -1,3 +1,4 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 import structlog
@@ -111,9 +112,10 @@ class DigestScheduler:
         self.scheduler.start()
         logger.info("scheduler_started")
 
-    def stop(self):
+    def stop(self) -> None:
         self.scheduler.shutdown()
         self.rss_collector.close()
+        self.email_sender.close()
         logger.info("scheduler_stopped")
 
     def run_now(self, job_name: str):
@@ -131,8 +133,17 @@ class DigestScheduler:
 
     def run_full_pipeline(self):
         logger.info("running_full_pipeline")
-        self.collect_rss_job()
-        self.collect_youtube_job()
+        # The collectors share nothing but the database, so their network
+        # waits overlap; processing starts once both have committed
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            collections = [
+                pool.submit(self.collect_rss_job),
+                pool.submit(self.collect_youtube_job),
+            ]
+            # Anything a job didn't catch itself surfaces here, as it did
+            # when the jobs ran one after the other
+            for collection in collections:
+                collection.result()
         self.process_content_job()
         self.generate_digest_job()
         self.send_digest_job()
@@ -1,7 +1,7 @@
 """
 Seed initial themes and companies for Investor Content OS
 """
-from src.storage import SessionLocal, Theme, Company
+from src.storage import Company, SessionLocal, Theme, insert_ignore
 
 INITIAL_THEMES = [
     ("AI Infrastructure", "Cloud, compute, MLOps, model serving"),
@@ -57,11 +57,11 @@ INITIAL_COMPANIES = [
 
 def seed_themes():
     with SessionLocal() as session:
-        for name, description in INITIAL_THEMES:
-            existing = session.query(Theme).filter_by(name=name).first()
-            if not existing:
-                theme = Theme(name=name, description=description)
-                session.add(theme)
+        # One statement; names already seeded are skipped by the unique index
+        session.execute(
+            insert_ignore(session, Theme),
+            [{"name": name, "description": description} for name, description in INITIAL_THEMES],
+        )
         session.commit()
         count = session.query(Theme).count()
         print(f"Seeded themes: {count} total")
@@ -69,11 +69,13 @@ def seed_themes():
 
 def seed_companies():
     with SessionLocal() as session:
-        for name, website, status in INITIAL_COMPANIES:
-            existing = session.query(Company).filter_by(name=name).first()
-            if not existing:
-                company = Company(name=name, website=website, status=status)
-                session.add(company)
+        session.execute(
+            insert_ignore(session, Company),
+            [
+                {"name": name, "website": website, "status": status}
+                for name, website, status in INITIAL_COMPANIES
+            ],
+        )
         session.commit()
         count = session.query(Company).count()
         print(f"Seeded companies: {count} total")
@@ -1,5 +1,18 @@
-from .database import SessionLocal, get_session, init_db
+from .database import (
+    SessionLocal,
+    content_search,
+    content_search_available,
+    existing_source_urls,
+    get_session,
+    init_db,
+    insert_contents,
+    insert_ignore,
+    request_scope,
+    session_scope,
+)
+from .migrations import MigrationError, migrate
 from .models import (
+    MAX_RAW_CONTENT_CHARS,
     Base,
     Category,
     Company,
@@ -9,13 +22,20 @@ from .models import (
     ContentThemeTag,
     ContentType,
     Digest,
+    FeedState,
     Lead,
     LeadAction,
+    SchemaMigration,
+    SummaryCache,
     Theme,
     UserPreferences,
+    signal_relevance,
+    table_of,
+    url_hash,
 )
 
 __all__ = [
+    "MAX_RAW_CONTENT_CHARS",
     "Base",
     "Category",
     "Company",
@@ -25,11 +45,26 @@ __all__ = [
     "ContentThemeTag",
     "ContentType",
     "Digest",
+    "FeedState",
     "Lead",
     "LeadAction",
+    "MigrationError",
+    "SchemaMigration",
     "SessionLocal",
+    "SummaryCache",
     "Theme",
     "UserPreferences",
+    "content_search",
+    "content_search_available",
+    "existing_source_urls",
     "get_session",
     "init_db",
+    "insert_contents",
+    "insert_ignore",
+    "migrate",
+    "request_scope",
+    "session_scope",
+    "signal_relevance",
+    "table_of",
+    "url_hash",
 ]
@@ -1,14 +1,167 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import functools
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Optional, Union
+
+from sqlalchemy import Table, column, create_engine, event, select, table
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, sessionmaker
 
 from src.config import settings
-from src.storage.models import Base
+from src.storage.models import Base, Content, url_hash
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+connect_args = {}
+if settings.database_url.startswith("sqlite"):
+    # Sessions are opened from ThreadingHTTPServer worker threads; wait on
+    # the file lock instead of failing when two requests write at once.
+    connect_args = {"check_same_thread": False, "timeout": 30, "cached_statements": 256}
+
+pool_args = {}
+if ":memory:" not in settings.database_url:
+    # One checkout per concurrent request or scheduler worker thread; recycle
+    # before server-side idle timeouts
+    pool_args = {"pool_size": 20, "max_overflow": 20, "pool_recycle": 1800}
+    if not settings.database_url.startswith("sqlite"):
+        # Catch connections the server dropped at checkout, not mid-query
+        pool_args["pool_pre_ping"] = True
+
+dialect_args = {}
+if make_url(settings.database_url).get_driver_name() == "psycopg2":
+    # executemany INSERTs go out as multi-row VALUES pages, and other
+    # executemany statements (bulk UPDATEs) through execute_batch
+    dialect_args = {
+        "executemany_mode": "values_plus_batch",
+        "insertmanyvalues_page_size": 500,
+        "executemany_batch_page_size": 500,
+    }
+
+if orjson is not None:
+    # Every JSON column, in both directions
+    dialect_args["json_serializer"] = lambda value: orjson.dumps(value).decode()
+    dialect_args["json_deserializer"] = orjson.loads
+
+engine = create_engine(
+    settings.database_url, echo=False, connect_args=connect_args, **pool_args, **dialect_args
+)
+
+_SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    # Off by default in SQLite; the tag and lead tables cascade deletes
+    "PRAGMA foreign_keys=ON",
+)
+
+if engine.dialect.name == "sqlite":
+
+    @event.listens_for(engine, "connect")
+    def _configure_sqlite(dbapi_connection: Any, connection_record: Any) -> None:
+        # Runs once per pooled connection; WAL lets readers proceed during writes
+        cursor = dbapi_connection.cursor()
+        for pragma in _SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
+
 
-engine = create_engine(settings.database_url, echo=False)
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
+_request_session: ContextVar[Optional[Session]] = ContextVar("request_session", default=None)
+
+
+@contextmanager
+def request_scope() -> Iterator[Session]:
+    """Bind one session for every session_scope() call inside the block."""
+    session = SessionLocal()
+    token = _request_session.set(session)
+    try:
+        yield session
+    finally:
+        _request_session.reset(token)
+        session.close()
+
+
+@contextmanager
+def session_scope() -> Iterator[Session]:
+    """The enclosing request_scope() session if there is one, else a new session."""
+    session = _request_session.get()
+    if session is None:
+        with SessionLocal() as session:
+            yield session
+        return
+    try:
+        yield session
+    except BaseException:
+        session.rollback()
+        raise
+
+
+def insert_ignore(
+    session: Session, model: Union[type[Base], Table]
+) -> Union[postgresql.Insert, sqlite.Insert]:
+    """INSERT that skips rows violating a unique index (Postgres or SQLite)."""
+    if session.get_bind().dialect.name == "postgresql":
+        return postgresql_insert(model).on_conflict_do_nothing()
+    return sqlite_insert(model).on_conflict_do_nothing()
+
+
+def insert_contents(session: Session, rows: list[dict[str, Any]]) -> list[Content]:
+    """INSERT Content ``rows`` as one executemany and return the stored rows.
+
+    ON CONFLICT DO NOTHING: a URL stored since the caller's existence check
+    (another collector, a concurrent run) is skipped instead of failing the
+    batch. RETURNING hands back only the rows actually inserted, fully loaded.
+    """
+    if not rows:
+        return []
+    return list(session.scalars(insert_ignore(session, Content).returning(Content), rows))
+
+
+def existing_source_urls(session: Session, urls: Iterable[str]) -> set[str]:
+    """The subset of ``urls`` already stored as content, in one IN query."""
+    wanted = set(urls) - {""}
+    if not wanted:
+        return set()
+    # Probe the integer url_hash index; source_url rules out hash collisions
+    return set(
+        session.scalars(
+            select(Content.source_url).where(
+                Content.url_hash.in_({url_hash(url) for url in wanted}),
+                Content.source_url.in_(wanted),
+            )
+        )
+    )
+
+
+# === Search indexes ===
+# SQLite databases get an FTS5 trigram table over content titles (see
+# migrations._create_search_indexes); search() queries it when it exists.
+
+content_search = table("content_search", column("rowid"), column("title"))
+
+
+@functools.cache
+def content_search_available() -> bool:
+    """True if the SQLite content_search FTS table exists."""
+    if engine.dialect.name != "sqlite":
+        return False
+    with engine.connect() as conn:
+        return conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE name = 'content_search'"
+        ).first() is not None
+
 
 def init_db() -> None:
+    """Create missing tables. Older databases are upgraded by ``migrations.migrate``."""
     Base.metadata.create_all(bind=engine)
 
 
@@ -0,0 +1,369 @@
+"""Versioned schema upgrades for databases created by earlier releases.
+
+``init_db`` only runs ``create_all``, which builds missing tables but never
+alters existing ones. The steps below bring an older database up to the
+current models; run them once with ``python main.py migrate``. Each applied
+step is recorded in ``schema_migrations`` and skipped from then on.
+
+Steps that would delete rows (duplicate tags, tags and leads whose parent is
+gone) refuse to run unless ``allow_deletes`` is set, and log every row id
+they remove.
+"""
+from collections.abc import Callable
+
+import structlog
+from sqlalchemy import (
+    JSON,
+    ColumnElement,
+    Connection,
+    DateTime,
+    String,
+    Table,
+    Text,
+    bindparam,
+    func,
+    inspect,
+    select,
+    update,
+)
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.schema import AddConstraint
+
+from src.storage.database import content_search_available, engine, init_db
+from src.storage.models import (
+    Base,
+    Content,
+    ContentCompanyTag,
+    ContentThemeTag,
+    ContentType,
+    EnumCode,
+    EpochDateTime,
+    SchemaMigration,
+    signal_relevance,
+    table_of,
+    url_hash,
+)
+
+logger = structlog.get_logger()
+
+
+class MigrationError(RuntimeError):
+    """A migration stopped before deleting rows it wasn't allowed to."""
+
+
+def _delete_rows(
+    conn: Connection,
+    table_: Table,
+    where: ColumnElement[bool],
+    reason: str,
+    allow_deletes: bool,
+) -> None:
+    ids = list(conn.scalars(select(table_.c.id).where(where)))
+    if not ids:
+        return
+    if not allow_deletes:
+        raise MigrationError(
+            f"{reason}: would delete {len(ids)} {table_.name} rows; "
+            "back up the database and rerun with --allow-deletes"
+        )
+    logger.warning("migration_deleted_rows", table=table_.name, reason=reason, ids=ids)
+    conn.execute(table_.delete().where(table_.c.id.in_(ids)))
+
+
+def _add_content_url_hash(allow_deletes: bool) -> None:
+    # Databases created before content.url_hash existed: add, backfill, index
+    if "url_hash" in {c["name"] for c in inspect(engine).get_columns("content")}:
+        return
+    content = table_of(Content)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ALTER TABLE content ADD COLUMN url_hash BIGINT")
+        rows = conn.execute(select(content.c.id, content.c.source_url)).all()
+        if rows:
+            conn.execute(
+                update(content).where(content.c.id == bindparam("row_id")),
+                [{"row_id": row_id, "url_hash": url_hash(url)} for row_id, url in rows],
+            )
+        next(ix for ix in content.indexes if ix.name == "ix_content_url_hash").create(conn)
+
+
+def _convert_json_columns(allow_deletes: bool) -> None:
+    # Older Postgres databases hold JSON columns as TEXT; psycopg2 only
+    # decodes json columns itself. SQLite stores JSON as text either way.
+    if engine.dialect.name != "postgresql":
+        return
+    existing = inspect(engine)
+    with engine.begin() as conn:
+        for table_ in Base.metadata.sorted_tables:
+            types = {c["name"]: c["type"] for c in existing.get_columns(table_.name)}
+            for column_ in table_.columns:
+                if isinstance(column_.type, JSON) and isinstance(types.get(column_.name), Text):
+                    conn.exec_driver_sql(
+                        f"ALTER TABLE {table_.name} ALTER COLUMN {column_.name} "
+                        f"TYPE JSON USING {column_.name}::json"
+                    )
+
+
+def _convert_epoch_columns(allow_deletes: bool) -> None:
+    # Older databases hold EpochDateTime columns as timestamps
+    existing = inspect(engine)
+    with engine.begin() as conn:
+        for table_ in Base.metadata.sorted_tables:
+            types = {c["name"]: c["type"] for c in existing.get_columns(table_.name)}
+            for column_ in table_.columns:
+                if not isinstance(column_.type, EpochDateTime):
+                    continue
+                name = column_.name
+                if engine.dialect.name == "postgresql":
+                    if isinstance(types.get(name), DateTime):
+                        conn.exec_driver_sql(
+                            f"ALTER TABLE {table_.name} ALTER COLUMN {name} TYPE BIGINT "
+                            f"USING extract(epoch FROM {name})::bigint"
+                        )
+                else:
+                    # SQLite keeps the declared type; the ISO text values,
+                    # stored without an offset (collectors write UTC), are
+                    # rewritten in place
+                    conn.exec_driver_sql(
+                        f"UPDATE {table_.name} "
+                        f"SET {name} = CAST(strftime('%s', {name}) AS INTEGER) "
+                        f"WHERE typeof({name}) = 'text'"
+                    )
+
+
+def _add_content_relevance_score(allow_deletes: bool) -> None:
+    # Databases created before relevance_score: add and backfill from the
+    # stored summaries
+    if "relevance_score" in {c["name"] for c in inspect(engine).get_columns("content")}:
+        return
+    content = table_of(Content)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "ALTER TABLE content ADD COLUMN relevance_score INTEGER NOT NULL DEFAULT 0"
+        )
+        rows = conn.execute(
+            select(content.c.id, content.c.investment_signals).where(
+                content.c.investment_signals.is_not(None)
+            )
+        ).all()
+        if rows:
+            conn.execute(
+                update(content).where(content.c.id == bindparam("row_id")),
+                [
+                    {"row_id": row_id, "relevance_score": signal_relevance(signals)}
+                    for row_id, signals in rows
+                ],
+            )
+
+
+def _convert_content_type_codes(allow_deletes: bool) -> None:
+    # Databases created when content_type held the enum's value as text
+    content_type = EnumCode(ContentType)
+    names = {member.value: content_type.codes[member] for member in content_type.members}
+    cases = " ".join(f"WHEN '{name}' THEN {code}" for name, code in names.items())
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            types = {c["name"]: c["type"] for c in inspect(engine).get_columns("content")}
+            if isinstance(types["content_type"], String):
+                conn.exec_driver_sql(
+                    "ALTER TABLE content ALTER COLUMN content_type TYPE SMALLINT "
+                    f"USING CASE content_type {cases} END"
+                )
+        else:
+            # SQLite can't change a column's type; the codes go into the
+            # existing column, which reads back as text digits
+            quoted = ", ".join(f"'{name}'" for name in names)
+            conn.exec_driver_sql(
+                f"UPDATE content SET content_type = CASE content_type {cases} END "
+                f"WHERE content_type IN ({quoted})"
+            )
+
+
+def _create_content_indexes(allow_deletes: bool) -> None:
+    # create_all doesn't add indexes to a content table that already exists
+    have = {ix["name"] for ix in inspect(engine).get_indexes("content")}
+    with engine.begin() as conn:
+        for index in table_of(Content).indexes:
+            if index.name not in have:
+                index.create(conn)
+
+
+def _create_unique_tag_indexes(allow_deletes: bool) -> None:
+    # create_all only builds indexes alongside new tables. Older databases
+    # get duplicate tag rows folded into the oldest one, then the index.
+    existing = inspect(engine)
+    for table_ in (table_of(ContentThemeTag), table_of(ContentCompanyTag)):
+        have = {ix["name"] for ix in existing.get_indexes(table_.name)}
+        for index in table_.indexes:
+            if not index.unique or index.name in have:
+                continue
+            keep = select(func.min(table_.c.id)).group_by(*index.columns)
+            with engine.begin() as conn:
+                _delete_rows(
+                    conn, table_, table_.c.id.not_in(keep), "duplicate tag", allow_deletes
+                )
+                index.create(conn)
+
+
+def _prune_orphans(conn: Connection, table_: Table, allow_deletes: bool) -> None:
+    # Rows pointing at parents deleted before the foreign keys existed
+    for fk in table_.foreign_keys:
+        orphan = fk.parent.is_not(None) & fk.parent.not_in(select(fk.column))
+        if fk.ondelete == "SET NULL":
+            ids = list(conn.scalars(select(table_.c.id).where(orphan)))
+            if ids:
+                logger.warning(
+                    "migration_unlinked_rows", table=table_.name, column=fk.parent.name, ids=ids
+                )
+                conn.execute(update(table_).where(orphan).values({fk.parent.name: None}))
+        else:
+            reason = f"{fk.parent.name} points at a missing {fk.column.table.name} row"
+            _delete_rows(conn, table_, orphan, reason, allow_deletes)
+
+
+def _rebuild_sqlite_table(conn: Connection, table_: Table) -> None:
+    # SQLite can't add a constraint to an existing table: move the old one
+    # aside, create the new one (with its indexes), copy the rows across
+    old = f"{table_.name}_old"
+    for ix in inspect(conn).get_indexes(table_.name):
+        conn.exec_driver_sql(f"DROP INDEX {ix['name']}")
+    have = {c["name"] for c in inspect(conn).get_columns(table_.name)}
+    columns = ", ".join(c.name for c in table_.columns if c.name in have)
+    conn.exec_driver_sql(f"ALTER TABLE {table_.name} RENAME TO {old}")
+    table_.create(conn)
+    conn.exec_driver_sql(f"INSERT INTO {table_.name} ({columns}) SELECT {columns} FROM {old}")
+    conn.exec_driver_sql(f"DROP TABLE {old}")
+
+
+def _add_foreign_keys(allow_deletes: bool) -> None:
+    # Tables created before the tag and lead columns declared foreign keys.
+    # sorted_tables puts leads before lead_actions, so a pruned lead's
+    # actions are pruned too, and a rebuilt parent is never renamed out
+    # from under a child's new constraint.
+    tables = [t for t in Base.metadata.sorted_tables if t.foreign_key_constraints]
+    if engine.dialect.name == "postgresql":
+        existing = inspect(engine)
+        with engine.begin() as conn:
+            for table_ in tables:
+                have = {
+                    tuple(fk["constrained_columns"])
+                    for fk in existing.get_foreign_keys(table_.name)
+                }
+                missing = [
+                    fk for fk in table_.foreign_key_constraints
+                    if tuple(fk.column_keys) not in have
+                ]
+                if missing:
+                    _prune_orphans(conn, table_, allow_deletes)
+                    for fk in missing:
+                        conn.execute(AddConstraint(fk))
+    elif engine.dialect.name == "sqlite":
+        with engine.connect() as conn:
+            stale = [t for t in tables if not inspect(conn).get_foreign_keys(t.name)]
+            if not stale:
+                return
+            # The pragma is a no-op inside a transaction, so it's switched
+            # between commits. Orphans go before any DDL, so a refused
+            # delete leaves the tables as they were.
+            conn.commit()
+            conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+            try:
+                for table_ in stale:
+                    _prune_orphans(conn, table_, allow_deletes)
+                for table_ in stale:
+                    _rebuild_sqlite_table(conn, table_)
+                conn.commit()
+            finally:
+                conn.rollback()
+                conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+
+
+# search() keeps its substring semantics (ILIKE '%q%'); these indexes let
+# the database answer it without scanning every row. Postgres uses pg_trgm
+# GIN indexes, which ILIKE picks up as-is. SQLite gets an FTS5 trigram
+# table over content titles, kept in sync by triggers.
+_POSTGRES_SEARCH_DDL: tuple[str, ...] = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_content_title_trgm ON content "
+    "USING gin (title gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_themes_name_trgm ON themes "
+    "USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_companies_name_trgm ON companies "
+    "USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_leads_why_now_trgm ON leads "
+    "USING gin (why_now gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_leads_owner_note_trgm ON leads "
+    "USING gin (owner_note gin_trgm_ops)",
+)
+
+_SQLITE_SEARCH_DDL: tuple[str, ...] = (
+    "CREATE VIRTUAL TABLE content_search USING fts5("
+    "title, content='content', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER content_search_ai AFTER INSERT ON content BEGIN "
+    "INSERT INTO content_search(rowid, title) VALUES (new.id, new.title); END",
+    "CREATE TRIGGER content_search_ad AFTER DELETE ON content BEGIN "
+    "INSERT INTO content_search(content_search, rowid, title) "
+    "VALUES ('delete', old.id, old.title); END",
+    "CREATE TRIGGER content_search_au AFTER UPDATE OF title ON content BEGIN "
+    "INSERT INTO content_search(content_search, rowid, title) "
+    "VALUES ('delete', old.id, old.title); "
+    "INSERT INTO content_search(rowid, title) VALUES (new.id, new.title); END",
+    # Index rows that existed before the table did
+    "INSERT INTO content_search(content_search) VALUES ('rebuild')",
+)
+
+
+def _create_search_indexes(allow_deletes: bool) -> None:
+    if engine.dialect.name == "postgresql":
+        ddl = _POSTGRES_SEARCH_DDL
+    elif engine.dialect.name == "sqlite" and not content_search_available():
+        ddl = _SQLITE_SEARCH_DDL
+    else:
+        return
+
+    try:
+        with engine.begin() as conn:
+            for stmt in ddl:
+                conn.exec_driver_sql(stmt)
+    except DBAPIError:
+        # No pg_trgm privileges / SQLite built without FTS5 trigram:
+        # search still works, just without the index
+        pass
+    content_search_available.cache_clear()
+
+
+# (version, name, step) in the order they run. Append new steps; never
+# renumber or reorder the ones a database may already have applied.
+MIGRATIONS: tuple[tuple[int, str, Callable[[bool], None]], ...] = (
+    (1, "content_url_hash", _add_content_url_hash),
+    (2, "json_columns", _convert_json_columns),
+    (3, "epoch_columns", _convert_epoch_columns),
+    (4, "content_relevance_score", _add_content_relevance_score),
+    (5, "content_type_codes", _convert_content_type_codes),
+    (6, "content_indexes", _create_content_indexes),
+    (7, "unique_tag_indexes", _create_unique_tag_indexes),
+    (8, "foreign_keys", _add_foreign_keys),
+    (9, "search_indexes", _create_search_indexes),
+)
+
+
+def migrate(allow_deletes: bool = False) -> list[str]:
+    """Apply the migrations this database hasn't run yet; returns their names.
+
+    Raises MigrationError, with every earlier step kept, if a step would
+    delete rows and ``allow_deletes`` is off.
+    """
+    init_db()
+    table = table_of(SchemaMigration)
+    with engine.connect() as conn:
+        done = set(conn.scalars(select(table.c.version)))
+
+    applied = []
+    for version, name, step in MIGRATIONS:
+        if version in done:
+            continue
+        logger.info("migration_running", version=version, name=name)
+        step(allow_deletes)
+        with engine.begin() as conn:
+            conn.execute(table.insert().values(version=version, name=name))
+        applied.append(name)
+    return applied
@@ -1,15 +1,71 @@
-from datetime import datetime
+import hashlib
+from datetime import datetime, timezone
 from enum import Enum
-from typing import Optional
-
-from sqlalchemy import DateTime, Index, String, Text, func, JSON
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+from typing import Any, Optional, Union
+
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    CheckConstraint,
+    DateTime,
+    ForeignKey,
+    Index,
+    SmallInteger,
+    String,
+    Table,
+    Text,
+    TypeDecorator,
+    func,
+)
+from sqlalchemy.engine import Dialect
+from sqlalchemy.engine.default import DefaultExecutionContext
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship, validates
 
 
 class Base(DeclarativeBase):
     pass
 
 
+# Collectors cut raw_content to this at ingest. It is also as much source
+# text as the summarizer sends, so anything longer would only be stored and moved
+MAX_RAW_CONTENT_CHARS = 30000
+
+
+# Lists/dicts as-is (encoded by the engine's json_serializer); None stays
+# SQL NULL rather than JSON null
+_JSON = JSON(none_as_null=True)
+
+
+def url_hash(url: str) -> int:
+    """Signed 64-bit BLAKE2b fingerprint of a URL, for indexed integer lookups."""
+    digest = hashlib.blake2b(url.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+def signal_relevance(investment_signals: Optional[dict[str, Any]]) -> int:
+    """The Content.relevance_score value for a summary's investment_signals."""
+    try:
+        return int((investment_signals or {}).get("relevance_score") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def table_of(model: type[Base]) -> Table:
+    """The Table behind a mapped class (``__table__`` is typed as a bare FromClause)."""
+    return Base.metadata.tables[model.__tablename__]
+
+
+def _utcnow() -> datetime:
+    # updated_at is set in Python, so the ORM knows the new value after a
+    # flush instead of expiring it and reading it back
+    return datetime.now(timezone.utc)
+
+
+def _default_url_hash(context: DefaultExecutionContext) -> int:
+    params = context.get_current_parameters()  # type: ignore[no-untyped-call]
+    return url_hash(params["source_url"])
+
+
 class ContentType(str, Enum):
     ARTICLE = "article"
     PODCAST = "podcast"
@@ -26,43 +82,163 @@ class Category(str, Enum):
     TREND = "trend"
 
 
+class EnumCode(TypeDecorator[Enum]):
+    """A str Enum stored as a SMALLINT: its 1-based position in the class.
+
+    Codes follow declaration order, so new members go at the end.
+    """
+
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, enum_class: type[Enum]):
+        super().__init__()
+        self.enum_class = enum_class
+        self.members = tuple(enum_class)
+        # str members hash like their values, so "video" and ContentType.VIDEO
+        # find the same code; anything else binds NULL and matches nothing
+        self.codes: dict[object, int] = {
+            member: code for code, member in enumerate(self.members, 1)
+        }
+
+    def process_bind_param(
+        self, value: Optional[Union[Enum, str]], dialect: Dialect
+    ) -> Optional[int]:
+        return None if value is None else self.codes.get(value)
+
+    def process_result_value(self, value: Optional[Any], dialect: Dialect) -> Optional[Enum]:
+        # int(): SQLite columns migrated in place keep TEXT affinity
+        return None if value is None else self.members[int(value) - 1]
+
+
+class EpochDateTime(TypeDecorator[datetime]):
+    """A datetime stored as whole Unix seconds (BIGINT); loads as an aware UTC datetime.
+
+    For range-scanned columns: integer keys compare and load without
+    SQLite's ISO string parsing. Naive values are taken as UTC.
+    """
+
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value: Optional[datetime], dialect: Dialect) -> Optional[int]:
+        if value is None:
+            return None
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp())
+
+    def process_result_value(self, value: Optional[Any], dialect: Dialect) -> Optional[datetime]:
+        return None if value is None else datetime.fromtimestamp(value, timezone.utc)
+
+
 class Content(Base):
     __tablename__ = "content"
 
     id: Mapped[int] = mapped_column(primary_key=True)
     source_name: Mapped[str] = mapped_column(String(255))
     source_url: Mapped[str] = mapped_column(String(2048), unique=True)
-    content_type: Mapped[ContentType] = mapped_column(String(50))
+    # Filled on insert; look up by url_hash, then confirm source_url
+    url_hash: Mapped[Optional[int]] = mapped_column(
+        BigInteger, nullable=True, default=_default_url_hash
+    )
+    content_type: Mapped[ContentType] = mapped_column(EnumCode(ContentType))
     title: Mapped[str] = mapped_column(String(500))
     author: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
-    publish_date: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    publish_date: Mapped[datetime] = mapped_column(EpochDateTime)
     raw_content: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     transcript: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     summary: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    categories: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # JSON string
-    entities: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # JSON string
-    investment_signals: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # JSON string
+    categories: Mapped[Optional[list[str]]] = mapped_column(_JSON, nullable=True)
+    entities: Mapped[Optional[dict[str, Any]]] = mapped_column(_JSON, nullable=True)
+    investment_signals: Mapped[Optional[dict[str, Any]]] = mapped_column(_JSON, nullable=True)
+    # Copied out of investment_signals when the summary is stored, so the
+    # digest ranks without decoding the JSON
+    relevance_score: Mapped[int] = mapped_column(default=0, server_default="0")
     duration_seconds: Mapped[Optional[int]] = mapped_column(nullable=True)
     processed: Mapped[bool] = mapped_column(default=False)
     included_in_digest: Mapped[bool] = mapped_column(default=False)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+        DateTime(timezone=True), default=_utcnow, onupdate=_utcnow
+    )
+
+    # Joins are spelled out rather than inferred from the tag tables' keys.
+    # Every relationship here raises instead of lazy loading: callers
+    # selectinload what they read, so a per-row query can't creep back in.
+    theme_tags: Mapped[list["ContentThemeTag"]] = relationship(
+        primaryjoin="Content.id == foreign(ContentThemeTag.content_id)",
+        order_by="ContentThemeTag.theme_id",
+        viewonly=True,
+        lazy="raise_on_sql",
+    )
+    company_tags: Mapped[list["ContentCompanyTag"]] = relationship(
+        primaryjoin="Content.id == foreign(ContentCompanyTag.content_id)",
+        order_by="ContentCompanyTag.company_id",
+        viewonly=True,
+        lazy="raise_on_sql",
     )
 
+    @validates("investment_signals")
+    def _sync_relevance_score(
+        self, key: str, value: Optional[dict[str, Any]]
+    ) -> Optional[dict[str, Any]]:
+        # ORM writes of the summary keep the ranking column in step; Core
+        # UPDATEs (the summarizer's) set relevance_score themselves
+        self.relevance_score = signal_relevance(value)
+        return value
+
     __table_args__ = (
         Index("ix_content_publish_date", "publish_date"),
         Index("ix_content_content_type", "content_type"),
-        Index("ix_content_processed", "processed"),
+        # Digest's "processed AND publish_date >= cutoff ORDER BY publish_date";
+        # the leading column also serves the summarizer's processed=False scan
+        Index("ix_content_recent", "processed", "publish_date"),
+        Index("ix_content_url_hash", "url_hash"),
+        CheckConstraint(
+            f"length(raw_content) <= {MAX_RAW_CONTENT_CHARS}", name="ck_content_raw_content_length"
+        ),
+    )
+
+
+class FeedState(Base):
+    __tablename__ = "feed_states"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    feed_url: Mapped[str] = mapped_column(String(2048), unique=True)
+    # Validators from the last 200 response
+    etag: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    last_modified: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=_utcnow, onupdate=_utcnow
     )
 
 
+class SummaryCache(Base):
+    __tablename__ = "summary_cache"
+
+    # sha256 of model, content type and normalized source text
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    result: Mapped[dict[str, Any]] = mapped_column(_JSON)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+class SchemaMigration(Base):
+    """A step of ``migrations.MIGRATIONS`` this database has applied."""
+
+    __tablename__ = "schema_migrations"
+
+    version: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    name: Mapped[str] = mapped_column(String(64))
+    applied_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_utcnow)
+
+
 class Conference(Base):
     __tablename__ = "conferences"
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(255))
-    start_date: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    start_date: Mapped[datetime] = mapped_column(EpochDateTime)
     end_date: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
     location: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
     website: Mapped[Optional[str]] = mapped_column(String(2048), nullable=True)
@@ -70,7 +246,7 @@ class Conference(Base):
         DateTime(timezone=True), nullable=True
     )
     quarter: Mapped[str] = mapped_column(String(10))  # e.g., "Q1 2025"
-    highlights: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # JSON string
+    highlights: Mapped[Optional[list[str]]] = mapped_column(_JSON, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
     __table_args__ = (Index("ix_conferences_start_date", "start_date"),)
@@ -81,8 +257,8 @@ class Digest(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True)
     date: Mapped[datetime] = mapped_column(DateTime(timezone=True), unique=True)
-    content_ids: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # JSON string
-    top_signal: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # JSON string
+    content_ids: Mapped[Optional[list[int]]] = mapped_column(_JSON, nullable=True)
+    top_signal: Mapped[Optional[dict[str, Any]]] = mapped_column(_JSON, nullable=True)
     html_content: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     sent: Mapped[bool] = mapped_column(default=False)
     sent_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
@@ -94,8 +270,8 @@ class UserPreferences(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True)
     email: Mapped[str] = mapped_column(String(255), unique=True)
-    focus_areas: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # JSON string
-    stage_preferences: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # JSON string
+    focus_areas: Mapped[Optional[list[str]]] = mapped_column(_JSON, nullable=True)
+    stage_preferences: Mapped[Optional[list[str]]] = mapped_column(_JSON, nullable=True)
     geography: Mapped[str] = mapped_column(String(50), default="US")
     active: Mapped[bool] = mapped_column(default=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
@@ -122,7 +298,7 @@ class Company(Base):
     status: Mapped[str] = mapped_column(String(50), default="Watch")  # Watch, Diligence, Pass, Invest
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+        DateTime(timezone=True), default=_utcnow, onupdate=_utcnow
     )
 
 
@@ -130,12 +306,20 @@ class ContentThemeTag(Base):
     __tablename__ = "content_theme_tags"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    content_id: Mapped[int] = mapped_column()
-    theme_id: Mapped[int] = mapped_column()
+    # Deleting the content or the theme deletes the tag, in the database
+    content_id: Mapped[int] = mapped_column(ForeignKey("content.id", ondelete="CASCADE"))
+    theme_id: Mapped[int] = mapped_column(ForeignKey("themes.id", ondelete="CASCADE"))
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
+    theme: Mapped[Optional["Theme"]] = relationship(
+        primaryjoin="foreign(ContentThemeTag.theme_id) == Theme.id",
+        viewonly=True,
+        lazy="raise_on_sql",
+    )
+
     __table_args__ = (
-        Index("ix_content_theme_content", "content_id"),
+        # Also serves content_id lookups as the leading column
+        Index("uq_content_theme", "content_id", "theme_id", unique=True),
         Index("ix_content_theme_theme", "theme_id"),
     )
 
@@ -144,12 +328,18 @@ class ContentCompanyTag(Base):
     __tablename__ = "content_company_tags"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    content_id: Mapped[int] = mapped_column()
-    company_id: Mapped[int] = mapped_column()
+    content_id: Mapped[int] = mapped_column(ForeignKey("content.id", ondelete="CASCADE"))
+    company_id: Mapped[int] = mapped_column(ForeignKey("companies.id", ondelete="CASCADE"))
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
+    company: Mapped[Optional["Company"]] = relationship(
+        primaryjoin="foreign(ContentCompanyTag.company_id) == Company.id",
+        viewonly=True,
+        lazy="raise_on_sql",
+    )
+
     __table_args__ = (
-        Index("ix_content_company_content", "content_id"),
+        Index("uq_content_company", "content_id", "company_id", unique=True),
         Index("ix_content_company_company", "company_id"),
     )
 
@@ -158,14 +348,33 @@ class Lead(Base):
     __tablename__ = "leads"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    company_id: Mapped[int] = mapped_column()
-    created_from_content_id: Mapped[Optional[int]] = mapped_column(nullable=True)
+    company_id: Mapped[int] = mapped_column(ForeignKey("companies.id", ondelete="CASCADE"))
+    created_from_content_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("content.id", ondelete="SET NULL"), nullable=True
+    )
     why_now: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     stage: Mapped[str] = mapped_column(String(50), default="New")  # New, Contacted, Meeting, Diligence, Done
     owner_note: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+        DateTime(timezone=True), default=_utcnow, onupdate=_utcnow
+    )
+
+    company: Mapped[Optional["Company"]] = relationship(
+        primaryjoin="foreign(Lead.company_id) == Company.id",
+        viewonly=True,
+        lazy="raise_on_sql",
+    )
+    source_content: Mapped[Optional["Content"]] = relationship(
+        primaryjoin="foreign(Lead.created_from_content_id) == Content.id",
+        viewonly=True,
+        lazy="raise_on_sql",
+    )
+    actions: Mapped[list["LeadAction"]] = relationship(
+        primaryjoin="Lead.id == foreign(LeadAction.lead_id)",
+        order_by="LeadAction.created_at.desc()",
+        viewonly=True,
+        lazy="raise_on_sql",
     )
 
     __table_args__ = (
@@ -178,7 +387,7 @@ class LeadAction(Base):
     __tablename__ = "lead_actions"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    lead_id: Mapped[int] = mapped_column()
+    lead_id: Mapped[int] = mapped_column(ForeignKey("leads.id", ondelete="CASCADE"))
     action_type: Mapped[str] = mapped_column(String(50))  # Questions, OutreachDraft, MemoSkeleton
     content: Mapped[str] = mapped_column(Text)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,32 @@
+import os
+import tempfile
+from collections.abc import Iterator
+
+import pytest
+
+# Point the engine at a scratch database before anything imports src.storage
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+
+from src.collectors.rss_collector import RSSCollector  # noqa: E402
+from src.collectors.youtube_collector import YouTubeCollector  # noqa: E402
+
+
+# One collector per test module; tests that patch the collector's client
+# build their own instead
+@pytest.fixture(scope="module")
+def rss_collector() -> Iterator[RSSCollector]:
+    collector = RSSCollector()
+    yield collector
+    collector.close()
+
+
+@pytest.fixture(scope="module")
+def youtube_collector() -> YouTubeCollector:
+    return YouTubeCollector()
+
+
+@pytest.fixture(scope="session")
+def db() -> None:
+    from src.storage import init_db
+
+    init_db()
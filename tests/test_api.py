@@ -0,0 +1,44 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from src import api
+from src.storage import Content, ContentType, SessionLocal
+
+
+@pytest.fixture
+def content_id(db: None) -> int:
+    with SessionLocal() as session:
+        content = Content(
+            source_name="Test Source",
+            source_url=f"https://example.com/{datetime.now().timestamp()}",
+            content_type=ContentType.ARTICLE,
+            title="Test article",
+            publish_date=datetime.now(timezone.utc),
+            processed=True,
+        )
+        session.add(content)
+        session.commit()
+        return content.id
+
+
+class TestTagging:
+    def test_tag_content_theme(self, content_id: int) -> None:
+        theme_id = api.create_theme("Agents")["id"]
+
+        assert "id" in api.tag_content_theme(content_id, theme_id)
+        assert api.tag_content_theme(content_id, theme_id) == {"exists": True}
+
+    def test_tag_unknown_ids(self, content_id: int) -> None:
+        theme_id = api.create_theme("Agents")["id"]
+        company_id = api.create_company("Acme")["id"]
+
+        assert api.tag_content_theme(content_id, 999999) is None
+        assert api.tag_content_theme(999999, theme_id) is None
+        assert api.tag_content_company(content_id, 999999) is None
+        assert api.bulk_tag_content(content_id, [theme_id], [999999]) is None
+        assert api.bulk_tag_content(999999, [theme_id], [company_id]) is None
+
+    def test_create_lead_unknown_company(self, content_id: int) -> None:
+        assert api.create_lead(999999, content_id) is None
+        assert "id" in api.create_lead(api.create_company("Acme")["id"], content_id)
@@ -1,73 +1,54 @@
-import pytest
-from unittest.mock import Mock, patch, MagicMock
 from datetime import datetime, timezone
+from unittest.mock import MagicMock, Mock
+
+import feedparser
+import pytest
 
 from src.collectors.rss_collector import RSSCollector
 from src.storage import ContentType
 
 
 class TestRSSCollector:
-    def test_determine_content_type_podcast(self):
-        collector = RSSCollector()
-        
+    def test_determine_content_type_podcast(self, rss_collector):
         # Test podcast detection by feed name
-        assert collector.determine_content_type({}, "a16z Podcast") == ContentType.PODCAST
-        assert collector.determine_content_type({}, "20VC Show") == ContentType.PODCAST
+        assert rss_collector.determine_content_type({}, "a16z Podcast") == ContentType.PODCAST
+        assert rss_collector.determine_content_type({}, "20VC Show") == ContentType.PODCAST
         
         # Test article detection
-        assert collector.determine_content_type({}, "TechCrunch") == ContentType.ARTICLE
-        
-        collector.close()
+        assert rss_collector.determine_content_type({}, "TechCrunch") == ContentType.ARTICLE
 
-    def test_determine_content_type_by_enclosure(self):
-        collector = RSSCollector()
-        
+    def test_determine_content_type_by_enclosure(self, rss_collector):
         entry_with_audio = {
             "links": [{"type": "audio/mpeg", "href": "http://example.com/audio.mp3"}]
         }
-        assert collector.determine_content_type(entry_with_audio, "Some Feed") == ContentType.PODCAST
-        
-        collector.close()
+        content_type = rss_collector.determine_content_type(entry_with_audio, "Some Feed")
+        assert content_type == ContentType.PODCAST
 
-    def test_parse_publish_date_with_published(self):
-        collector = RSSCollector()
-        
+    def test_parse_publish_date_with_published(self, rss_collector):
         entry = MagicMock()
         entry.published_parsed = (2025, 1, 15, 10, 30, 0, 0, 0, 0)
         
-        result = collector.parse_publish_date(entry)
+        result = rss_collector.parse_publish_date(entry)
         assert result.year == 2025
         assert result.month == 1
         assert result.day == 15
-        
-        collector.close()
 
-    def test_parse_publish_date_fallback(self):
-        collector = RSSCollector()
-        
+    def test_parse_publish_date_fallback(self, rss_collector):
         entry = MagicMock()
         entry.published_parsed = None
         entry.updated_parsed = None
         
-        result = collector.parse_publish_date(entry)
+        result = rss_collector.parse_publish_date(entry)
         assert result.tzinfo == timezone.utc
-        
-        collector.close()
 
-    def test_extract_content_from_content_field(self):
-        collector = RSSCollector()
-        
+    def test_extract_content_from_content_field(self, rss_collector):
         entry = MagicMock()
         entry.content = [{"value": "This is the content"}]
         
-        result = collector.extract_content(entry)
+        result = rss_collector.extract_content(entry)
         assert result == "This is the content"
-        
-        collector.close()
 
-    def test_extract_content_from_summary(self):
-        collector = RSSCollector()
-        
+    def test_extract_content_from_summary(self, rss_collector):
         entry = MagicMock()
         entry.content = None
         entry.summary = "This is the summary"
@@ -75,42 +56,134 @@ class TestRSSCollector:
         # Need to handle hasattr properly
         del entry.content
         
-        result = collector.extract_content(entry)
+        result = rss_collector.extract_content(entry)
         assert result == "This is the summary"
-        
+
+    def test_classify_entry_returns_audio_url(self, rss_collector):
+        entry = {
+            "links": [
+                {"type": "text/html", "href": "http://example.com/post"},
+                {"type": "audio/mpeg", "href": "http://example.com/link.mp3"},
+            ],
+            "enclosures": [{"type": "audio/mpeg", "href": "http://example.com/enclosure.mp3"}],
+        }
+        assert rss_collector.classify_entry(entry, podcast_feed=False) == (
+            ContentType.PODCAST,
+            "http://example.com/enclosure.mp3",
+        )
+        assert rss_collector.classify_entry({}, podcast_feed=False) == (ContentType.ARTICLE, None)
+        assert rss_collector.classify_entry({}, podcast_feed=True) == (ContentType.PODCAST, None)
+
+    def test_fetch_feed_not_modified(self):
+        collector = RSSCollector()
+
+        response = Mock(status_code=304)
+        collector.client.get = Mock(return_value=response)
+
+        modified = "Mon, 13 Jan 2025 10:00:00 GMT"
+        feed = collector.fetch_feed("http://example.com/feed", etag='"v1"', modified=modified)
+        assert feed.status == 304
+        assert feed.entries == []
+        collector.client.get.assert_called_once_with(
+            "http://example.com/feed",
+            headers={"If-None-Match": '"v1"', "If-Modified-Since": modified},
+        )
+
         collector.close()
 
-    def test_get_audio_url(self):
+    def test_fast_parse_matches_feedparser(self):
+        pytest.importorskip("lxml")
+        from src.collectors.rss_collector import _fast_parse
+
+        xml = b"""<?xml version="1.0"?>
+<rss version="2.0"><channel><title>Some Podcast</title>
+<item><title>Tom &amp; Jerry</title><link>http://example.com/1</link>
+<pubDate>Wed, 15 Jan 2025 10:30:00 GMT</pubDate>
+<description><![CDATA[<p>Hi <script>x()</script>there</p>]]></description>
+<enclosure url="http://example.com/1.mp3" type="audio/mpeg"/></item>
+</channel></rss>"""
+        fast = _fast_parse(xml)
+        slow = feedparser.parse(xml)
+
+        assert fast.feed.title == slow.feed.title
+        for key in ("title", "link", "summary", "published_parsed", "enclosures"):
+            assert fast.entries[0].get(key) == slow.entries[0].get(key), key
+
+    def test_fast_parse_falls_back_on_unsupported_input(self):
+        from src.collectors.rss_collector import _fast_parse
+
+        assert _fast_parse(b"<rss><channel><item><title>broken</item></channel>") is None
+        rdf = b'<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"/>'
+        assert _fast_parse(rdf) is None
+
+    def test_fetch_feed_falls_back_to_feedparser_without_lxml(self, monkeypatch):
+        from src.collectors import rss_collector
+
+        monkeypatch.setattr(rss_collector, "etree", None)
         collector = RSSCollector()
-        
+        xml = b"""<?xml version="1.0"?>
+<rss version="2.0"><channel><title>Feed</title>
+<item><title>Post</title><link>http://example.com/1</link></item>
+</channel></rss>"""
+        response = Mock(status_code=200, content=xml, headers={"ETag": '"v2"'})
+        collector.client.get = Mock(return_value=response)
+
+        feed = collector.fetch_feed("http://example.com/feed")
+        assert feed.feed.title == "Feed"
+        assert feed.entries[0].link == "http://example.com/1"
+        assert feed.etag == '"v2"'
+
+        collector.close()
+
+    def test_feedparser_private_helpers(self):
+        # The fast path imports these; fail loudly if a feedparser release drops them
+        from feedparser.datetimes import _parse_date
+        from feedparser.sanitizer import _sanitize_html
+
+        assert _parse_date("Wed, 15 Jan 2025 10:30:00 GMT")[:5] == (2025, 1, 15, 10, 30)
+        cleaned = _sanitize_html("<p>Hi <script>x()</script>there</p>", "utf-8", "text/html")
+        assert cleaned == "<p>Hi there</p>"
+
+    def test_get_audio_url(self, rss_collector):
         entry = {
             "enclosures": [
                 {"type": "audio/mpeg", "href": "http://example.com/episode.mp3"}
             ]
         }
-        
-        result = collector.get_audio_url(entry)
+
+        result = rss_collector.get_audio_url(entry)
         assert result == "http://example.com/episode.mp3"
-        
-        collector.close()
 
 
 class TestYouTubeCollector:
-    def test_parse_duration_hours_minutes_seconds(self):
-        from src.collectors.youtube_collector import YouTubeCollector
-        
-        collector = YouTubeCollector()
-        
-        assert collector.parse_duration("PT1H30M45S") == 5445
-        assert collector.parse_duration("PT45M30S") == 2730
-        assert collector.parse_duration("PT10M") == 600
-        assert collector.parse_duration("PT30S") == 30
-        assert collector.parse_duration("PT2H") == 7200
-        
-    def test_parse_duration_invalid(self):
-        from src.collectors.youtube_collector import YouTubeCollector
-        
-        collector = YouTubeCollector()
-        
-        assert collector.parse_duration("invalid") == 0
-        assert collector.parse_duration("") == 0
+    def test_parse_duration_hours_minutes_seconds(self, youtube_collector):
+        assert youtube_collector.parse_duration("PT1H30M45S") == 5445
+        assert youtube_collector.parse_duration("PT45M30S") == 2730
+        assert youtube_collector.parse_duration("PT10M") == 600
+        assert youtube_collector.parse_duration("PT30S") == 30
+        assert youtube_collector.parse_duration("PT2H") == 7200
+        
+    def test_parse_duration_invalid(self, youtube_collector):
+        assert youtube_collector.parse_duration("invalid") == 0
+        assert youtube_collector.parse_duration("") == 0
+
+
+class TestWebScraper:
+    def test_lxml_fields_match_beautifulsoup(self):
+        pytest.importorskip("lxml")
+        from src.collectors.web_scraper import WebScraper
+
+        scraper = WebScraper()
+        html = """<html><head><title>Plain</title>
+<meta property="og:title" content="OG Title"></head>
+<body><header>Site</header><div class="byline Author"> Ann <b>Lee</b> </div>
+<time datetime="2025-01-15T10:30:00Z">Jan 15</time>
+<article><p> First </p><!-- ad --><p>Second <i>part</i></p></article></body></html>"""
+
+        assert scraper._lxml_fields(html) == scraper._soup_fields(html)
+
+        result = scraper.extract_article_content(html, "http://example.com/a")
+        assert result["author"] == "AnnLee"
+        assert result["publish_date"] == datetime(2025, 1, 15, 10, 30, tzinfo=timezone.utc)
+
+        scraper.close()
@@ -0,0 +1,110 @@
+import http.client
+import json
+import threading
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer
+from typing import Any, Optional
+
+import pytest
+
+import server
+from src.api import TagBatcher
+
+
+class TestRouting:
+    def test_every_route_resolves(self) -> None:
+        for method, shape, route in server._route_shapes(server.ROUTES):
+            ids = tuple(range(1, shape.count(server._ID) + 1))
+            id_values = iter(ids)
+            segs = [str(next(id_values)) if seg == server._ID else seg for seg in shape]
+
+            assert server.resolve(method, segs) == (route, ids), (method, segs)
+
+    def test_unknown_and_malformed_paths(self) -> None:
+        assert server.resolve("GET", ["api", "nope"]) == (None, ())
+        assert server.resolve("GET", ["api", "content", "abc"]) == (None, ())
+        assert server.resolve("GET", ["api", "content", "²"]) == (None, ())
+        assert server.resolve("GET", ["api", "content", "1" * 10]) == (None, ())
+        assert server.resolve("PUT", ["api", "themes"]) == (None, ())
+
+    def test_split_target(self) -> None:
+        assert server._split_target("/api/feed?filter=podcast") == ("/api/feed", "filter=podcast")
+        assert server._split_target("/api/feed") == ("/api/feed", "")
+
+
+@pytest.fixture(scope="module")
+def base_url(db: None) -> Iterator[tuple[str, int]]:
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), server.ContentOSHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    host, port = httpd.server_address[:2]
+    yield str(host), port
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _request(
+    address: tuple[str, int], method: str, path: str, body: Optional[dict[str, Any]] = None
+) -> Any:
+    host, port = address
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    try:
+        conn.request(method, path, body=None if body is None else json.dumps(body))
+        return json.loads(conn.getresponse().read())
+    finally:
+        conn.close()
+
+
+class TestServer:
+    def test_write_invalidates_cached_get(self, base_url: tuple[str, int]) -> None:
+        before = _request(base_url, "GET", "/api/themes")
+        # Stored once the response has been written
+        deadline = time.monotonic() + 5
+        while ("/api/themes", ()) not in server._CACHE and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert ("/api/themes", ()) in server._CACHE
+
+        created = _request(base_url, "POST", "/api/themes", {"name": "Cache Test"})
+        assert ("/api/themes", ()) not in server._CACHE
+
+        after = _request(base_url, "GET", "/api/themes")
+        assert created["id"] not in {theme["id"] for theme in before}
+        assert created["id"] in {theme["id"] for theme in after}
+
+    def test_tag_unknown_content(self, base_url: tuple[str, int]) -> None:
+        theme = _request(base_url, "POST", "/api/themes", {"name": "Tag Test"})
+
+        response = _request(base_url, "POST", f"/api/content/999999/themes/{theme['id']}")
+        assert response == {"error": "Not found"}
+
+    def test_feed(self, base_url: tuple[str, int]) -> None:
+        feed = _request(base_url, "GET", "/api/feed?filter=article")
+
+        assert set(feed) == {"items", "total"}
+        assert feed["total"] >= len(feed["items"])
+
+    def test_unknown_endpoint(self, base_url: tuple[str, int]) -> None:
+        assert _request(base_url, "POST", "/api/nope") == {"error": "Unknown endpoint"}
+
+
+class TestTagBatcher:
+    def test_failing_op_only_fails_its_caller(self, db: None) -> None:
+        batcher = TagBatcher(max_wait_ms=100)
+
+        def ok(session: object, value: int) -> int:
+            return value
+
+        def fail(session: object, value: int) -> int:
+            raise ValueError(value)
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = [pool.submit(batcher.submit, fail if i == 2 else ok, i) for i in range(4)]
+
+            for i, future in enumerate(futures):
+                if i == 2:
+                    with pytest.raises(ValueError):
+                        future.result(timeout=10)
+                else:
+                    assert future.result(timeout=10) == i
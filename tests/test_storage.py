@@ -0,0 +1,237 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from src.storage import ContentType
+from src.storage.models import EnumCode
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# The tables as the first release created them: VARCHAR content types,
+# DATETIME text, JSON in TEXT columns and no foreign keys
+BASELINE_SCHEMA = """
+CREATE TABLE content (
+    id INTEGER NOT NULL,
+    source_name VARCHAR(255) NOT NULL,
+    source_url VARCHAR(2048) NOT NULL,
+    content_type VARCHAR(50) NOT NULL,
+    title VARCHAR(500) NOT NULL,
+    author VARCHAR(255),
+    publish_date DATETIME NOT NULL,
+    raw_content TEXT,
+    transcript TEXT,
+    summary TEXT,
+    categories TEXT,
+    entities TEXT,
+    investment_signals TEXT,
+    duration_seconds INTEGER,
+    processed BOOLEAN NOT NULL,
+    included_in_digest BOOLEAN NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    PRIMARY KEY (id),
+    UNIQUE (source_url)
+);
+CREATE INDEX ix_content_publish_date ON content (publish_date);
+CREATE INDEX ix_content_processed ON content (processed);
+CREATE INDEX ix_content_content_type ON content (content_type);
+CREATE TABLE conferences (
+    id INTEGER NOT NULL,
+    name VARCHAR(255) NOT NULL,
+    start_date DATETIME NOT NULL,
+    end_date DATETIME,
+    location VARCHAR(255),
+    website VARCHAR(2048),
+    registration_deadline DATETIME,
+    quarter VARCHAR(10) NOT NULL,
+    highlights TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    PRIMARY KEY (id)
+);
+CREATE INDEX ix_conferences_start_date ON conferences (start_date);
+CREATE TABLE themes (
+    id INTEGER NOT NULL,
+    name VARCHAR(255) NOT NULL,
+    description TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    PRIMARY KEY (id),
+    UNIQUE (name)
+);
+CREATE TABLE companies (
+    id INTEGER NOT NULL,
+    name VARCHAR(255) NOT NULL,
+    website VARCHAR(2048),
+    notes TEXT,
+    status VARCHAR(50) NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    PRIMARY KEY (id),
+    UNIQUE (name)
+);
+CREATE TABLE content_theme_tags (
+    id INTEGER NOT NULL,
+    content_id INTEGER NOT NULL,
+    theme_id INTEGER NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    PRIMARY KEY (id)
+);
+CREATE INDEX ix_content_theme_theme ON content_theme_tags (theme_id);
+CREATE INDEX ix_content_theme_content ON content_theme_tags (content_id);
+CREATE TABLE content_company_tags (
+    id INTEGER NOT NULL,
+    content_id INTEGER NOT NULL,
+    company_id INTEGER NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    PRIMARY KEY (id)
+);
+CREATE INDEX ix_content_company_company ON content_company_tags (company_id);
+CREATE INDEX ix_content_company_content ON content_company_tags (content_id);
+CREATE TABLE leads (
+    id INTEGER NOT NULL,
+    company_id INTEGER NOT NULL,
+    created_from_content_id INTEGER,
+    why_now TEXT,
+    stage VARCHAR(50) NOT NULL,
+    owner_note TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    PRIMARY KEY (id)
+);
+CREATE INDEX ix_leads_company ON leads (company_id);
+CREATE INDEX ix_leads_stage ON leads (stage);
+CREATE TABLE lead_actions (
+    id INTEGER NOT NULL,
+    lead_id INTEGER NOT NULL,
+    action_type VARCHAR(50) NOT NULL,
+    content TEXT NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    PRIMARY KEY (id)
+);
+CREATE INDEX ix_lead_actions_lead ON lead_actions (lead_id);
+
+INSERT INTO content (id, source_name, source_url, content_type, title, publish_date,
+                     categories, investment_signals, processed, included_in_digest)
+VALUES (1, 'a16z Podcast', 'https://example.com/1', 'podcast', 'Episode 1',
+        '2025-01-15 10:30:00.000000', '["funding", "trend"]', '{"relevance_score": 8}', 1, 0);
+INSERT INTO themes (id, name) VALUES (1, 'Agents');
+INSERT INTO companies (id, name, status) VALUES (1, 'Acme', 'Watch');
+INSERT INTO content_theme_tags (id, content_id, theme_id) VALUES (1, 1, 1), (2, 1, 99);
+INSERT INTO content_company_tags (id, content_id, company_id) VALUES (1, 1, 1), (2, 1, 1);
+INSERT INTO leads (id, company_id, created_from_content_id, stage)
+VALUES (1, 1, 1, 'New'), (2, 1, 42, 'New'), (3, 77, NULL, 'New');
+INSERT INTO lead_actions (id, lead_id, action_type, content) VALUES (1, 1, 'Questions', 'q'),
+                                                                   (2, 3, 'Questions', 'q');
+"""
+
+# The engine binds to DATABASE_URL at import, so migrations run in their own process
+MIGRATE_SCRIPT = """
+import json
+import sys
+from src.storage import Content, MigrationError, SessionLocal, migrate
+
+try:
+    applied = migrate(allow_deletes="--allow-deletes" in sys.argv)
+except MigrationError as e:
+    print(json.dumps({"error": str(e)}))
+    raise SystemExit
+with SessionLocal() as session:
+    content = session.get(Content, 1)
+    print(json.dumps({
+        "applied": applied,
+        "content_type": content.content_type.value,
+        "publish_date": content.publish_date.isoformat(),
+        "categories": content.categories,
+        "investment_signals": content.investment_signals,
+        "relevance_score": content.relevance_score,
+        "url_hash": content.url_hash,
+    }))
+"""
+
+
+# The migrated content row as the subprocess saw it, and a connection to the file
+Upgraded = tuple[dict[str, Any], sqlite3.Connection]
+
+
+@pytest.fixture
+def baseline_db(tmp_path: Path) -> Path:
+    path = tmp_path / "baseline.db"
+    with sqlite3.connect(path) as conn:
+        conn.executescript(BASELINE_SCHEMA)
+    return path
+
+
+def _migrate(path: Path, *args: str) -> Any:
+    result = subprocess.run(
+        [sys.executable, "-c", MIGRATE_SCRIPT, *args],
+        cwd=ROOT,
+        env={**os.environ, "DATABASE_URL": f"sqlite:///{path}"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+@pytest.fixture
+def upgraded(baseline_db: Path) -> Iterator[Upgraded]:
+    content = _migrate(baseline_db, "--allow-deletes")
+    conn = sqlite3.connect(baseline_db)
+    yield content, conn
+    conn.close()
+
+
+class TestMigrate:
+    def test_content_columns(self, upgraded: Upgraded) -> None:
+        content, conn = upgraded
+
+        assert content["content_type"] == ContentType.PODCAST
+        assert content["publish_date"].startswith("2025-01-15T10:30:00")
+        assert content["categories"] == ["funding", "trend"]
+        assert content["investment_signals"] == {"relevance_score": 8}
+        assert content["relevance_score"] == 8
+        assert content["url_hash"] is not None
+        # SQLite keeps the VARCHAR column, holding the code as text digits
+        stored = conn.execute("SELECT content_type, typeof(publish_date) FROM content")
+        code = EnumCode(ContentType).codes[ContentType.PODCAST]
+        assert stored.fetchone() == (str(code), "integer")
+
+    def test_foreign_keys_and_orphans(self, upgraded: Upgraded) -> None:
+        _, conn = upgraded
+
+        fks = conn.execute("PRAGMA foreign_key_list(content_theme_tags)").fetchall()
+        assert {(fk[2], fk[6]) for fk in fks} == {("content", "CASCADE"), ("themes", "CASCADE")}
+        assert conn.execute("SELECT id FROM content_theme_tags").fetchall() == [(1,)]
+        # Duplicate tag pairs collapse under the unique index
+        assert conn.execute("SELECT count(*) FROM content_company_tags").fetchone() == (1,)
+        # Unknown company: dropped; unknown source content: unlinked
+        leads = conn.execute("SELECT id, created_from_content_id FROM leads ORDER BY id")
+        assert leads.fetchall() == [(1, 1), (2, None)]
+        assert conn.execute("SELECT id FROM lead_actions").fetchall() == [(1,)]
+        assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+
+    def test_applied_steps_are_recorded(self, baseline_db: Path) -> None:
+        first = _migrate(baseline_db, "--allow-deletes")
+
+        with sqlite3.connect(baseline_db) as conn:
+            names = conn.execute("SELECT name FROM schema_migrations ORDER BY version")
+            assert [name for (name,) in names] == first["applied"]
+        assert _migrate(baseline_db, "--allow-deletes")["applied"] == []
+
+    def test_refuses_to_delete_rows(self, baseline_db: Path) -> None:
+        result = _migrate(baseline_db)
+
+        assert "duplicate tag" in result["error"]
+        with sqlite3.connect(baseline_db) as conn:
+            assert conn.execute("SELECT count(*) FROM content_company_tags").fetchone() == (2,)
+            assert conn.execute("SELECT count(*) FROM leads").fetchone() == (3,)
+            # The steps before the refused one stay applied
+            names = conn.execute("SELECT name FROM schema_migrations").fetchall()
+            assert ("unique_tag_indexes",) not in names
+            assert ("content_url_hash",) in names